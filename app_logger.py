@@ -2,16 +2,29 @@ import logging
 import os
 from logging.handlers import RotatingFileHandler
 
-# Create logs directory if it doesn't exist
-os.makedirs("./logs", exist_ok=True)
+
+LOG_FILE_PATH = "./logs/api_logs.txt"
+
+
+class _LazyRotatingFileHandler(RotatingFileHandler):
+    """Creates the logs directory and opens the log file on the first record, not on import."""
+
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, delay=True, **kwargs)
+
+    def _open(self):
+        # Create logs directory if it doesn't exist
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
 
 # Configure logging using basicConfig
 logging.basicConfig(
     level=logging.WARN,
     format="%(asctime)s %(filename)s %(levelname)s %(message)s",
     handlers=[
-        RotatingFileHandler(
-            "./logs/api_logs.txt",
+        _LazyRotatingFileHandler(
+            LOG_FILE_PATH,
             maxBytes=1*1024*1024,  # 1MB
             backupCount=7  # Keep 7 backup files
         ),
@@ -26,4 +39,4 @@ _logger.setLevel(logging.INFO)
 
 def getLogger():
     """Returns the configured logger instance for use in other modules"""
-    return _logger
\ No newline at end of file
+    return _logger
@@ -0,0 +1,298 @@
+"""
+On-demand request profiling.
+
+Profiling is switched on at runtime (see controllers/profiling_controllers.py) for a
+fraction of the requests and/or for specific routes. For every profiled request:
+
+- spans time the interesting steps (dependency resolution, queries, serialization),
+  see `span` and `profiled`, and are aggregated per route;
+- a sampling profiler thread takes the Python stack of the threads that are inside a
+  span of a profiled request every few milliseconds, and aggregates them as folded
+  stacks ("frame;frame;frame count" lines), the input of flamegraph.pl or speedscope.
+
+When profiling is disabled the middleware only checks a flag, spans do a single
+context variable lookup and the sampler thread is not running.
+"""
+
+import os
+import sys
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Deque, Dict, List, Optional
+
+from fastapi.responses import JSONResponse
+
+from app_logger import getLogger
+
+module_logger = getLogger()
+
+DEFAULT_SAMPLE_RATE = 0.01  # Fraction of the requests profiled once profiling is enabled
+DEFAULT_SAMPLING_INTERVAL = 0.005  # Seconds between two stack samples
+MAX_STACK_DEPTH = 64
+RECENT_PROFILES_SIZE = 100  # Profiled requests whose individual spans are kept
+EXCLUDED_PATH_PREFIX = "/admin/profiling"  # Never profile the profiler's own endpoints
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+class RequestProfile:
+    """Spans of one profiled request."""
+
+    def __init__(self, scope: Dict[str, Any]):
+        self._scope = scope
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.spans: List[Dict[str, Any]] = []
+
+    @property
+    def route(self) -> str:
+        """Method and path template (e.g. "GET /users/{given_cno}") once routed, the raw path before."""
+        route = self._scope.get("route")
+        return f"{self._scope['method']} {getattr(route, 'path', self._scope['path'])}"
+
+
+class _Span:
+    __slots__ = ("profile", "name", "sample", "started_at")
+
+    def __init__(self, profile: RequestProfile, name: str, sample: bool):
+        self.profile = profile
+        self.name = name
+        self.sample = sample
+
+    def __enter__(self):
+        if self.sample:
+            profiler.register_thread(self.profile)
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter() - self.started_at
+        if self.sample:
+            profiler.unregister_thread()
+        self.profile.spans.append({"name": self.name, "start": self.started_at, "duration": duration})
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, sample: bool = True):
+    """
+    Context manager timing a step of the current request, a no-op unless the request is profiled.
+    With `sample` the thread running the step is sampled by the profiler while it is inside
+    the span, so the span must not await (the event loop thread runs other requests meanwhile).
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return _NO_SPAN
+    return _Span(profile, name, sample)
+
+
+def profiled(name: str):
+    """Decorator wrapping every call of a (sync) function in a span."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Profiler:
+    """Runtime configuration and aggregated results of the request profiling."""
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = DEFAULT_SAMPLE_RATE
+        self.routes: List[str] = []
+        self.sampling_interval = DEFAULT_SAMPLING_INTERVAL
+
+        self._lock = threading.Lock()
+        # Thread ident -> [profile, nesting depth] of the threads currently inside a span
+        self._threads: Dict[int, list] = {}
+        self._stacks: Counter = Counter()
+        self._span_stats: Dict[tuple, Dict[str, float]] = {}
+        self._recent: Deque[RequestProfile] = deque(maxlen=RECENT_PROFILES_SIZE)
+        self._profiled_requests = 0
+        self._samples = 0
+
+        self._sampler: Optional[threading.Thread] = None
+        self._sampler_stopped = threading.Event()
+
+    def configure(self, enabled: bool, sample_rate: float = DEFAULT_SAMPLE_RATE,
+                  routes: Optional[List[str]] = None, sampling_interval: float = DEFAULT_SAMPLING_INTERVAL):
+        self.sample_rate = sample_rate
+        self.routes = list(routes or [])
+        self.sampling_interval = sampling_interval
+        self.enabled = enabled
+
+        if enabled and self._sampler is None:
+            self._sampler_stopped.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+            self._sampler.start()
+        elif not enabled and self._sampler is not None:
+            self._sampler_stopped.set()
+            self._sampler.join()
+            self._sampler = None
+        module_logger.info(f"Request profiling {'enabled' if enabled else 'disabled'}: "
+                           f"sample_rate={sample_rate}, routes={self.routes}")
+
+    def should_profile(self, path: str) -> bool:
+        if path.startswith(EXCLUDED_PATH_PREFIX):
+            return False
+        if any(path.startswith(route) for route in self.routes):
+            return True
+        return random.random() < self.sample_rate
+
+    def register_thread(self, profile: RequestProfile):
+        ident = threading.get_ident()
+        with self._lock:
+            entry = self._threads.get(ident)
+            if entry is None:
+                self._threads[ident] = [profile, 1]
+            else:
+                entry[1] += 1
+
+    def unregister_thread(self):
+        ident = threading.get_ident()
+        with self._lock:
+            entry = self._threads.get(ident)
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._threads[ident]
+
+    def record(self, profile: RequestProfile):
+        """Aggregates the spans of a finished request."""
+        with self._lock:
+            self._profiled_requests += 1
+            self._recent.append(profile)
+            for request_span in profile.spans:
+                stats = self._span_stats.setdefault((profile.route, request_span["name"]),
+                                                    {"count": 0, "total": 0.0, "max": 0.0})
+                stats["count"] += 1
+                stats["total"] += request_span["duration"]
+                stats["max"] = max(stats["max"], request_span["duration"])
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._span_stats.clear()
+            self._recent.clear()
+            self._profiled_requests = 0
+            self._samples = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "routes": self.routes,
+            "sampling_interval_ms": self.sampling_interval * 1000,
+            "profiled_requests": self._profiled_requests,
+            "samples": self._samples,
+        }
+
+    def span_stats(self) -> List[Dict[str, Any]]:
+        """Count, total and maximum duration of every span, per route, slowest in total first."""
+        with self._lock:
+            items = list(self._span_stats.items())
+        return sorted(
+            ({"route": route, "name": name, "count": stats["count"],
+              "total_ms": stats["total"] * 1000, "mean_ms": stats["total"] * 1000 / stats["count"],
+              "max_ms": stats["max"] * 1000}
+             for (route, name), stats in items),
+            key=lambda stats: stats["total_ms"], reverse=True)
+
+    def recent_profiles(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            profiles = list(self._recent)
+        return [
+            {"route": profile.route, "started_at": profile.started_at, "duration_ms": profile.duration * 1000,
+             "spans": [{"name": request_span["name"], "duration_ms": request_span["duration"] * 1000}
+                       for request_span in profile.spans]}
+            for profile in profiles
+        ]
+
+    def folded_stacks(self) -> str:
+        """Aggregated samples in the folded stack format, one "frames count" line per distinct stack."""
+        with self._lock:
+            stacks = sorted(self._stacks.items())
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def _sample_loop(self):
+        own_ident = threading.get_ident()
+        while not self._sampler_stopped.wait(self.sampling_interval):
+            with self._lock:
+                threads = {ident: entry[0] for ident, entry in self._threads.items() if ident != own_ident}
+            if not threads:
+                continue
+
+            frames = sys._current_frames()
+            samples = []
+            for ident, profile in threads.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    samples.append(_fold(profile.route, frame))
+            del frames
+
+            with self._lock:
+                self._stacks.update(samples)
+                self._samples += len(samples)
+
+
+def _fold(route: str, frame) -> str:
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    names.append(route)
+    return ";".join(reversed(names))
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware selecting the requests to profile."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not profiler.enabled or scope["type"] != "http" or not profiler.should_profile(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope)
+        token = _current_profile.set(profile)
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile.duration = time.perf_counter() - started_at
+            profile.spans.append({"name": "request", "start": started_at, "duration": profile.duration})
+            _current_profile.reset(token)
+            profiler.record(profile)
+
+
+class ProfiledJSONResponse(JSONResponse):
+    """JSONResponse timing the JSON encoding of the response body in a `serialization` span."""
+
+    def render(self, content: Any) -> bytes:
+        with span("serialization"):
+            return super().render(content)
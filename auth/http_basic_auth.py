@@ -5,11 +5,13 @@ from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from typing import Annotated, Dict
 
 from auth.rbac import authorized_users_db
+from app_profiler import profiled
 
 
 security = HTTPBasic()
 
 def allowed_roles(roles: list):
+    @profiled("allowed_roles")
     def is_role_allowed(user_info: Annotated[Dict[str, str], Depends(verify_credentials)]):
         if user_info["role"] not in roles:
             raise HTTPException(
@@ -20,6 +22,7 @@ def allowed_roles(roles: list):
     return is_role_allowed
 
 
+@profiled("verify_credentials")
 def verify_credentials(credentials: Annotated[HTTPBasicCredentials, Depends(security)]):
     """
     Verify username and password against our database. 
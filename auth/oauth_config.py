@@ -1,4 +1,6 @@
 import os
+from functools import lru_cache
+
 from dotenv import load_dotenv
 
 
@@ -8,8 +10,6 @@ load_dotenv()
 """
 OAuth 2.0 / OpenID Connect Configuration for Google
 """
-from authlib.integrations.starlette_client import OAuth
-from starlette.config import Config
 
 # Google OAuth configuration
 # Get your Client ID and Client Secret from Google Cloud Console:
@@ -26,20 +26,24 @@ OAUTH_REDIRECT_URI = "http://localhost:8000/auth"
 # Session configuration
 SESSION_SECRET_KEY = os.environ.get("APP_SESSION_SECRET_KEY")
 
-# Initialize OAuth
-oauth = OAuth()
-
-oauth.register(
-    name='google',
-    client_id=OAUTH_CLIENT_ID,
-    client_secret=OAUTH_CLIENT_SECRET,
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={
-        'scope': 'openid email profile'
-    }
-)
-
 
+@lru_cache(maxsize=None)
 def get_oauth_client():
-    """Returns the configured Google OAuth client"""
+    """
+    Returns the configured Google OAuth client.
+    authlib is imported and the client registered on first use, which keeps it out of
+    the application's import (and therefore cold start) time.
+    """
+    from authlib.integrations.starlette_client import OAuth
+
+    oauth = OAuth()
+    oauth.register(
+        name='google',
+        client_id=OAUTH_CLIENT_ID,
+        client_secret=OAUTH_CLIENT_SECRET,
+        server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+        client_kwargs={
+            'scope': 'openid email profile'
+        }
+    )
     return oauth.google
@@ -0,0 +1,27 @@
+from typing import Optional
+
+from fastapi import APIRouter, Query
+
+from app_logger import getLogger
+from data_store import characters_snapshot
+from dto import CharacterPage
+
+
+module_logger = getLogger()
+
+router = APIRouter(prefix="/characters", tags=["characters"])
+
+
+@router.get("/", response_model=CharacterPage)
+def get_characters(homeworld: Optional[str] = None,
+                   gender: Optional[str] = None,
+                   eye_color: Optional[str] = None,
+                   name_prefix: Optional[str] = None,
+                   offset: int = Query(0, ge=0),
+                   limit: int = Query(20, ge=1, le=100)):
+    module_logger.info(f"Querying characters: homeworld={homeworld}, gender={gender}, "
+                       f"eye_color={eye_color}, name_prefix={name_prefix}, offset={offset}, limit={limit}")
+    snapshot = characters_snapshot.get_snapshot()
+    total, items = snapshot.query(filters={"homeworld": homeworld, "gender": gender, "eye_color": eye_color},
+                                  name_prefix=name_prefix, offset=offset, limit=limit)
+    return CharacterPage(total=total, offset=offset, limit=limit, items=items)
@@ -0,0 +1,57 @@
+from typing import List
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app_logger import getLogger
+from app_profiler import profiler
+from dto import ProfilingConfig, SpanStats
+from auth.http_basic_auth import allowed_roles
+from auth.rbac import Role
+
+
+module_logger = getLogger()
+
+router = APIRouter(prefix="/admin/profiling", tags=["profiling"],
+                   dependencies=[Depends(allowed_roles(roles=[Role.ROOT, Role.ADMIN]))])
+
+
+@router.get("/")
+def get_profiling_status():
+    return profiler.summary()
+
+
+@router.put("/")
+def configure_profiling(config: ProfilingConfig):
+    """
+    Switches request profiling on or off at runtime.
+    Requests whose path starts with one of `routes` are always profiled, any other
+    request with a probability of `sample_rate`.
+    """
+    module_logger.info(f"Configuring request profiling: {config}")
+    profiler.configure(enabled=config.enabled, sample_rate=config.sample_rate, routes=config.routes,
+                       sampling_interval=config.sampling_interval_ms / 1000)
+    return profiler.summary()
+
+
+@router.get("/flamegraph", response_class=PlainTextResponse)
+def get_flamegraph():
+    """Aggregated stack samples in the folded format of flamegraph.pl (also opened by speedscope)."""
+    return profiler.folded_stacks()
+
+
+@router.get("/spans", response_model=List[SpanStats])
+def get_span_stats():
+    return profiler.span_stats()
+
+
+@router.get("/requests")
+def get_recent_profiles():
+    """Spans of the most recently profiled requests."""
+    return profiler.recent_profiles()
+
+
+@router.delete("/")
+def reset_profiling():
+    profiler.reset()
+    return profiler.summary()
@@ -0,0 +1,64 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from controllers.user_controllers import router
+from data_store import postgresql_db_store
+from dto import MAX_LOOKUP_BATCH_SIZE, User
+
+ADMIN = ("osama", "osama123")
+MAINTAINER = ("shihab", "shihab123")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    users = [User(name="Ali", email="ali@example.com", contact_no="111"),
+             User(name="Sara", email="sara@example.com", contact_no="222")]
+    queries = []
+
+    def get_users_by_contact_nos(contact_nos, conn=None):
+        queries.append(contact_nos)
+        return [user for user in users if user.contact_no in contact_nos]
+
+    monkeypatch.setattr(postgresql_db_store, "get_users_by_contact_nos", get_users_by_contact_nos)
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[postgresql_db_store.get_db] = lambda: "connection"
+    test_client = TestClient(app)
+    test_client.queries = queries
+    return test_client
+
+
+def test_lookup_returns_found_and_missing_with_one_query(client):
+    """Test that a batch lookup resolves all contact numbers at once, in request order and without duplicates."""
+    # Act
+    response = client.post("/users/lookup", auth=ADMIN, json={"contact_nos": ["222", "999", "111", "222"]})
+
+    # Assert
+    assert response.status_code == 200
+    assert [user["contact_no"] for user in response.json()["found"]] == ["222", "111"]
+    assert response.json()["missing"] == ["999"]
+    assert client.queries == [["222", "999", "111"]]
+
+
+def test_lookup_enforces_max_batch_size(client):
+    """Test that batches above MAX_LOOKUP_BATCH_SIZE (or empty ones) are rejected without a query."""
+    # Act
+    too_large = client.post("/users/lookup", auth=ADMIN,
+                            json={"contact_nos": [str(i) for i in range(MAX_LOOKUP_BATCH_SIZE + 1)]})
+    empty = client.post("/users/lookup", auth=ADMIN, json={"contact_nos": []})
+
+    # Assert
+    assert too_large.status_code == 422
+    assert empty.status_code == 422
+    assert client.queries == []
+
+
+def test_lookup_shares_the_rbac_rules_of_get_specific_user(client):
+    """Test that roles not allowed to read a specific user cannot look users up either."""
+    # Act
+    response = client.post("/users/lookup", auth=MAINTAINER, json={"contact_nos": ["111"]})
+
+    # Assert
+    assert response.status_code == 403
+    assert client.queries == []
@@ -1,11 +1,14 @@
-from typing import List
+import json
+import asyncio
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from app_logger import getLogger
 from data_store import postgresql_db_store
-from dto import User
+from data_store.change_feed import RecentIds, hub
+from dto import User, UserLookupRequest, UserLookupResult
 from auth.http_basic_auth import allowed_roles
 from auth.rbac import Role
 
@@ -14,6 +17,9 @@ module_logger = getLogger()
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+HEARTBEAT_INTERVAL = 15  # Seconds between keep-alive comments on idle change feeds
+USER_READ_ROLES = [Role.ADMIN, Role.AUDITOR]  # Roles allowed to look users up by contact no
+
 
 @router.get("/", response_model=List[User])
 def get_all_users(db=Depends(postgresql_db_store.get_db)):
@@ -21,9 +27,74 @@ def get_all_users(db=Depends(postgresql_db_store.get_db)):
     return postgresql_db_store.get_all_users(conn=db)
 
 
+@router.get("/changes")
+async def stream_user_changes(request: Request,
+                              last_event_id: Optional[int] = None,
+                              last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")):
+    """
+    Server-Sent Events feed of user inserts and deletes.
+    Every event id is a resume token: browsers send it back as the Last-Event-ID header
+    when they reconnect (or pass it as ?last_event_id=) to receive the changes they missed.
+    A `reset` event tells the client to reload the full list instead.
+    """
+    if last_event_id is None and last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = int(last_event_id_header)
+
+    subscription = await hub.subscribe(last_event_id)
+    module_logger.info(f"Change feed subscriber connected ({hub.subscriber_count} connected).")
+
+    async def event_stream():
+        sent_ids = RecentIds()
+        try:
+            yield "retry: 3000\n\n"
+            if subscription.needs_reset:
+                yield "event: reset\ndata: {}\n\n"
+
+            pending = list(subscription.backlog)
+            while not subscription.dropped:
+                if not pending:
+                    try:
+                        pending.append(await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_INTERVAL))
+                    except asyncio.TimeoutError:
+                        if await request.is_disconnected():
+                            return
+                        yield ": keep-alive\n\n"
+                        continue
+
+                change = pending.pop(0)
+                # The backlog and the live queue may overlap right after a resume
+                if not sent_ids.add(change["id"]):
+                    continue
+                data = {key: change[key] for key in ("name", "email", "contact_no")}
+                yield f"id: {change['id']}\nevent: {change['op']}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.post("/lookup", response_model=UserLookupResult)
+def lookup_users(lookup: UserLookupRequest, db=Depends(postgresql_db_store.get_db),
+                 username: str = Depends(allowed_roles(roles=USER_READ_ROLES))):
+    """
+    Batch version of GET /users/{given_cno}: resolves up to MAX_LOOKUP_BATCH_SIZE contact
+    numbers with a single query. Found users and missing contact numbers are returned
+    in the order of the request, without duplicates.
+    """
+    contact_nos = list(dict.fromkeys(lookup.contact_nos))
+    module_logger.info(f"Looking up {len(contact_nos)} Users by contact no.")
+    users_by_contact_no = {user.contact_no: user
+                           for user in postgresql_db_store.get_users_by_contact_nos(contact_nos, conn=db)}
+    return UserLookupResult(
+        found=[users_by_contact_no[contact_no] for contact_no in contact_nos if contact_no in users_by_contact_no],
+        missing=[contact_no for contact_no in contact_nos if contact_no not in users_by_contact_no],
+    )
+
+
 @router.get("/{given_cno}", response_model=User)
 def get_specific_user(given_cno: str, db=Depends(postgresql_db_store.get_db), 
-                      username: str = Depends(allowed_roles(roles=[Role.ADMIN, Role.AUDITOR]))):
+                      username: str = Depends(allowed_roles(roles=USER_READ_ROLES))):
     module_logger.info(f"Filtering the User by civil id no: {given_cno}")
     user = postgresql_db_store.get_user_by_contact_no(given_cno, conn=db)
     if user:
@@ -0,0 +1,191 @@
+import json
+import select
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+import psycopg2.extensions
+
+from app_logger import getLogger
+from data_store import postgresql_db_store
+
+module_logger = getLogger()
+
+BUFFER_SIZE = 1_000  # Recent changes kept in memory to resume subscribers without a query
+SUBSCRIBER_QUEUE_SIZE = 256  # Changes a slow subscriber may fall behind before it is dropped
+LISTEN_POLL_TIMEOUT = 5  # Seconds the listener waits for a notification before checking for shutdown
+MAX_RECONNECT_DELAY = 30  # Seconds
+
+
+class RecentIds:
+    """
+    Bounded set of the most recently seen change ids.
+    Used to drop duplicates without assuming that changes arrive in the order of their ids.
+    """
+
+    def __init__(self, size: int = BUFFER_SIZE):
+        self._size = size
+        self._ids: Set[int] = set()
+        self._order: Deque[int] = deque()
+
+    def add(self, change_id: int) -> bool:
+        """Remembers a change id, returns False if it was already seen."""
+        if change_id in self._ids:
+            return False
+        self._ids.add(change_id)
+        self._order.append(change_id)
+        if len(self._order) > self._size:
+            self._ids.discard(self._order.popleft())
+        return True
+
+
+class Subscription:
+    """Changes of one subscriber: a resume backlog followed by the live changes."""
+
+    def __init__(self, backlog: List[Dict[str, Any]], needs_reset: bool = False):
+        self.backlog = backlog
+        # True when the changes since the resume token are no longer available
+        self.needs_reset = needs_reset
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = False
+
+
+class ChangeFeedHub:
+    """
+    Fans the user change notifications of a single database listener out to any
+    number of subscribers.
+
+    The listener runs in a background thread on its own connection (LISTEN
+    user_changes) and hands every change to the event loop, which appends it to a
+    ring buffer and to every subscriber's bounded queue. A subscriber that cannot
+    keep up is dropped instead of slowing everyone down; it resumes with its last
+    change id like any reconnecting client.
+    """
+
+    def __init__(self, buffer_size: int = BUFFER_SIZE,
+                 listen: Optional[Callable[[threading.Event], None]] = None):
+        """
+        :param listen: Listener run in the background thread until the given event is set,
+                       listens for notifications of the database by default.
+        """
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listen_func = listen or self._listen
+        self._listener: Optional[threading.Thread] = None
+        self._stopped: Optional[threading.Event] = None
+        self._seen_ids = RecentIds()
+        # Highest change id received, the listener catches up from it after a reconnect
+        self._last_id = 0
+
+    def start(self):
+        """Starts the listener thread on first use."""
+        if self._listener is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        # Every listener has its own stop event, so a restart can never revive a stopping one
+        self._stopped = threading.Event()
+        self._listener = threading.Thread(target=self._listen_func, args=(self._stopped,),
+                                          name="user-changes-listener", daemon=True)
+        self._listener.start()
+
+    def stop(self):
+        """Stops the listener and waits until it has closed its connection."""
+        if self._listener is None:
+            return
+        self._stopped.set()
+        self._listener.join(timeout=LISTEN_POLL_TIMEOUT + 1)
+        if self._listener.is_alive():
+            module_logger.warning("User changes listener did not stop in time, it exits on its own.")
+        self._listener = None
+
+    async def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Registers a subscriber. With a resume token (the id of the last change the
+        client saw) the changes after it are replayed first, from the ring buffer if
+        it still holds them and from the change log table otherwise.
+        """
+        self.start()
+
+        if last_event_id is None:
+            subscription = Subscription(backlog=[])
+        elif self._buffer and self._buffer[0]["id"] <= last_event_id:
+            # No await between reading the buffer and registering, so nothing is missed
+            subscription = Subscription(backlog=[change for change in self._buffer if change["id"] > last_event_id])
+        else:
+            subscription = Subscription(backlog=[])
+            self._subscribers.add(subscription)
+            try:
+                subscription.backlog = await asyncio.to_thread(
+                    postgresql_db_store.get_user_changes_since, last_event_id, BUFFER_SIZE)
+            except Exception as e:
+                module_logger.warning(f"Unable to resume change feed after {last_event_id}: {e}")
+                subscription.needs_reset = True
+            if len(subscription.backlog) >= BUFFER_SIZE:
+                # Too far behind to replay, the client has to reload instead
+                subscription.backlog = []
+                subscription.needs_reset = True
+            return subscription
+
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, change: Dict[str, Any]):
+        """Delivers a change to every subscriber. Must run on the event loop."""
+        self._buffer.append(change)
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(change)
+            except asyncio.QueueFull:
+                subscription.dropped = True
+                self._subscribers.discard(subscription)
+
+    def _listen(self, stopped: threading.Event):
+        reconnect_delay = 1
+        while not stopped.is_set():
+            conn = None
+            try:
+                conn = postgresql_db_store.get_connection()
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {postgresql_db_store.USER_CHANGES_CHANNEL};")
+                module_logger.info("Listening for user changes.")
+                reconnect_delay = 1
+
+                # Changes committed while (re)connecting were not notified to us
+                if self._last_id:
+                    for change in postgresql_db_store.get_user_changes_since(self._last_id, conn=conn):
+                        self._dispatch(change)
+
+                while not stopped.is_set():
+                    if select.select([conn], [], [], LISTEN_POLL_TIMEOUT) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self._dispatch(json.loads(notify.payload))
+            except Exception as e:
+                module_logger.warning(f"User changes listener failed, reconnecting in {reconnect_delay}s: {e}")
+                stopped.wait(reconnect_delay)
+                reconnect_delay = min(reconnect_delay * 2, MAX_RECONNECT_DELAY)
+            finally:
+                if conn:
+                    conn.close()
+
+    def _dispatch(self, change: Dict[str, Any]):
+        # Changes replayed after a reconnect may have been notified already
+        if not self._seen_ids.add(change["id"]):
+            return
+        self._last_id = max(self._last_id, change["id"])
+        self._loop.call_soon_threadsafe(self.publish, change)
+
+
+hub = ChangeFeedHub()
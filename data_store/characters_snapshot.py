@@ -0,0 +1,141 @@
+import os
+import asyncio
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app_logger import getLogger
+from utils.load import SINK_FILE_PATHS
+
+module_logger = getLogger()
+
+INDEXED_FIELDS = ("homeworld", "gender", "eye_color")
+RELOAD_INTERVAL = 5  # Seconds between checks for a new ETL output
+CHARACTERS_SINKS = ("json", "columnar")  # File based sinks /characters can be served from
+
+
+def characters_file_path(sink: str) -> str:
+    """Returns the output file of the sink the ETL pipeline loads the characters with."""
+    if sink not in CHARACTERS_SINKS:
+        raise ValueError(f"Unsupported APP_CHARACTERS_SINK {sink!r}, expected one of: {', '.join(CHARACTERS_SINKS)}")
+    return SINK_FILE_PATHS[sink]
+
+
+# Sink the ETL pipeline loads the characters with, /characters serves its output
+CHARACTERS_SINK = os.environ.get("APP_CHARACTERS_SINK", "json")
+CHARACTERS_FILE_PATH = characters_file_path(CHARACTERS_SINK)
+
+
+class CharactersSnapshot:
+    """
+    Immutable, indexed view of one version of the ETL output.
+    Secondary indexes map the (lower cased) value of every field in INDEXED_FIELDS to
+    the ascending row numbers having it, names are kept sorted for prefix lookups.
+    """
+
+    def __init__(self, characters: List[Dict[str, Any]], version: Tuple = ()):
+        self.characters = tuple(characters)
+        self.version = version
+
+        indexes = {field: {} for field in INDEXED_FIELDS}
+        names = []
+        for row, character in enumerate(self.characters):
+            for field in INDEXED_FIELDS:
+                value = character.get(field)
+                if value is not None:
+                    indexes[field].setdefault(str(value).lower(), []).append(row)
+            if character.get("name") is not None:
+                names.append((str(character["name"]).lower(), row))
+
+        self._indexes = {field: {value: tuple(rows) for value, rows in index.items()}
+                         for field, index in indexes.items()}
+        self._names = sorted(names)
+        self._name_keys = [name for name, _ in self._names]
+
+    def query(self, filters: Optional[Dict[str, str]] = None, name_prefix: Optional[str] = None,
+              offset: int = 0, limit: int = 20) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Returns the total number of matching characters and one page of them, in
+        the order of the ETL output. Filters match case-insensitively.
+        """
+        candidates = []
+        for field, value in (filters or {}).items():
+            if value is not None:
+                candidates.append(self._indexes[field].get(value.lower(), ()))
+
+        if name_prefix:
+            prefix = name_prefix.lower()
+            start = bisect.bisect_left(self._name_keys, prefix)
+            end = bisect.bisect_left(self._name_keys, prefix + "\uffff", lo=start)
+            candidates.append(sorted(row for _, row in self._names[start:end]))
+
+        if not candidates:
+            rows = range(len(self.characters))
+        else:
+            # Intersect starting from the most selective index
+            candidates.sort(key=len)
+            matching = set(candidates[0])
+            for other in candidates[1:]:
+                matching.intersection_update(other)
+            rows = sorted(matching)
+
+        return len(rows), [self.characters[row] for row in rows[offset:offset + limit]]
+
+
+_current_snapshot: Optional[CharactersSnapshot] = None
+_reload_lock = threading.Lock()
+
+
+def get_snapshot() -> CharactersSnapshot:
+    """
+    Returns the current snapshot, loading it on first use.
+    Callers keep the returned object for the whole request, so a concurrent reload
+    never changes the data a request is working on.
+    """
+    snapshot = _current_snapshot
+    if snapshot is None:
+        snapshot = refresh_snapshot()
+    return snapshot
+
+
+def refresh_snapshot(file_path: str = CHARACTERS_FILE_PATH) -> CharactersSnapshot:
+    """
+    Loads the ETL output into a new snapshot if the file changed since the current
+    snapshot was built, and swaps it in with a single reference assignment. Requests
+    are never blocked, they keep reading the previous snapshot while this runs.
+    """
+    global _current_snapshot
+    from utils.helper_functions import iter_records
+
+    with _reload_lock:
+        try:
+            stat = os.stat(file_path)
+            version = (file_path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            version = ()
+
+        if _current_snapshot is not None and _current_snapshot.version == version:
+            return _current_snapshot
+
+        try:
+            characters = list(iter_records(file_path)) if version else []
+        except Exception as e:
+            module_logger.error(f"Error loading characters from {file_path}, keeping the current snapshot: {e}")
+            return _current_snapshot or CharactersSnapshot([], version=())
+
+        _current_snapshot = CharactersSnapshot(characters, version=version)
+        module_logger.info(f"Loaded characters snapshot with {len(characters)} characters from {file_path}.")
+        return _current_snapshot
+
+
+async def watch_snapshot(file_path: str = CHARACTERS_FILE_PATH, interval: float = RELOAD_INTERVAL):
+    """
+    Background task that hot-swaps the snapshot whenever the pipeline writes a new output
+    to `file_path`, the output of the APP_CHARACTERS_SINK sink by default.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(refresh_snapshot, file_path)
+        except Exception as e:
+            module_logger.error(f"Error refreshing characters snapshot: {e}")
+        await asyncio.sleep(interval)
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from dto import User
 from typing import List
 
@@ -5,10 +6,15 @@ from app_logger import getLogger
 
 module_logger = getLogger()
 
-temp_user_store: List[User] = [
-    User(name='Mr.A', email='mra@gmail.com', contact_no="12345678"),
-    User(name='Mr.B', email='mrb@gmail.com', contact_no="12345679"),
-    User(name='Mr.C', email='mrc@gmail.com', contact_no="12345671")
-]
 
-module_logger.info("Created a temporary dict as DB with 4 users.")
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_temp_user_store() -> List[User]:
+    """Builds the sample users on first use instead of on import."""
+    temp_user_store: List[User] = [
+        User(name='Mr.A', email='mra@gmail.com', contact_no="12345678"),
+        User(name='Mr.B', email='mrb@gmail.com', contact_no="12345679"),
+        User(name='Mr.C', email='mrc@gmail.com', contact_no="12345671")
+    ]
+
+    module_logger.info("Created a temporary dict as DB with 4 users.")
+    return temp_user_store
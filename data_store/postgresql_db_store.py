@@ -1,7 +1,11 @@
+import io
+import json
+
 import psycopg2
 from typing import List, Optional
 from dto import User
 from app_logger import getLogger
+from app_profiler import profiled, span
 
 module_logger = getLogger()
 
@@ -30,7 +34,8 @@ def get_db():
     """Dependency function for FastAPI to inject database connections."""
     conn = None
     try:
-        conn = get_connection()
+        with span("get_db"):
+            conn = get_connection()
         module_logger.debug("Database connection established")
         yield conn
     except Exception as e:
@@ -65,6 +70,172 @@ def create_users_table():
         raise
 
 
+# Channel of the notifications sent when users are created or deleted
+USER_CHANGES_CHANNEL = "user_changes"
+# Advisory lock serializing the writers of the change log, so change ids follow commit order
+USER_CHANGES_LOCK_ID = 730_201
+
+
+def create_user_changes_table():
+    """Create the change log of the users table if it doesn't exist."""
+    create_table_query = """
+    CREATE TABLE IF NOT EXISTS user_changes (
+        id BIGSERIAL PRIMARY KEY,
+        op VARCHAR(10) NOT NULL,
+        name VARCHAR(255),
+        email VARCHAR(255),
+        contact_no VARCHAR(20) NOT NULL,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """
+    
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(create_table_query)
+                conn.commit()
+                module_logger.info("User changes table created or already exists.")
+    except Exception as e:
+        module_logger.error(f"Error creating user changes table: {e}")
+        raise
+
+
+def _record_user_change(cur, op: str, name: str, email: str, contact_no: str):
+    """
+    Append a change to the change log and notify the listeners, in the caller's transaction.
+    PostgreSQL only delivers the notification once the transaction commits.
+
+    Ids are taken from a sequence when the row is inserted, not when it is committed, so
+    two overlapping transactions could commit their changes in the opposite order of
+    their ids, and a reader resuming "after id N" would miss the lower one. The
+    transaction level advisory lock is held until the caller commits, so the next change
+    only gets its id once this one is committed.
+    """
+    cur.execute("SELECT pg_advisory_xact_lock(%s);", (USER_CHANGES_LOCK_ID,))
+    cur.execute(
+        "INSERT INTO user_changes (op, name, email, contact_no) VALUES (%s, %s, %s, %s) RETURNING id;",
+        (op, name, email, contact_no)
+    )
+    change_id = cur.fetchone()[0]
+    payload = {"id": change_id, "op": op, "name": name, "email": email, "contact_no": contact_no}
+    cur.execute("SELECT pg_notify(%s, %s);", (USER_CHANGES_CHANNEL, json.dumps(payload)))
+
+
+def get_user_changes_since(change_id: int, limit: int = 1000, conn=None) -> List[dict]:
+    """Retrieve the changes after the given change id, oldest first."""
+    select_query = """
+    SELECT id, op, name, email, contact_no FROM user_changes
+    WHERE id > %s ORDER BY id LIMIT %s;
+    """
+    
+    try:
+        if conn:
+            with conn.cursor() as cur:
+                cur.execute(select_query, (change_id, limit))
+                rows = cur.fetchall()
+        else:
+            with get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(select_query, (change_id, limit))
+                    rows = cur.fetchall()
+        return [{"id": row[0], "op": row[1], "name": row[2], "email": row[3], "contact_no": row[4]} for row in rows]
+    except Exception as e:
+        module_logger.error(f"Error retrieving user changes: {e}")
+        raise
+
+
+# Columns of the characters table, in the order of the ETL schema (utils/transform.py)
+CHARACTER_COLUMNS = (
+    "name", "height", "mass", "hair_color", "skin_color", "eye_color",
+    "birth_year", "gender", "homeworld", "created", "edited", "url"
+)
+
+
+def create_characters_table(conn=None):
+    """Create the characters table loaded by the ETL pipeline if it doesn't exist."""
+    column_definitions = ",\n        ".join(
+        f"{column} TEXT PRIMARY KEY" if column == "url" else f"{column} TEXT"
+        for column in CHARACTER_COLUMNS
+    )
+    create_table_query = f"""
+    CREATE TABLE IF NOT EXISTS characters (
+        {column_definitions},
+        loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """
+    
+    try:
+        if conn:
+            with conn.cursor() as cur:
+                cur.execute(create_table_query)
+                conn.commit()
+        else:
+            with get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(create_table_query)
+                    conn.commit()
+        module_logger.info("Characters table created or already exists.")
+    except Exception as e:
+        module_logger.error(f"Error creating characters table: {e}")
+        raise
+
+
+def upsert_characters(characters: List[dict], conn) -> int:
+    """
+    Bulk upsert a batch of characters in a single transaction.
+    The batch is streamed with COPY into a temporary staging table and then merged
+    into the characters table with one set-based INSERT ... ON CONFLICT statement.
+    Characters without a url (the key) are skipped.
+    """
+    column_list = ", ".join(CHARACTER_COLUMNS)
+    # Not LIKE characters: that would copy the NOT NULL of the url primary key, and a single
+    # record without a url would then fail the COPY of the whole batch instead of being skipped
+    staging_columns = ", ".join(f"{column} TEXT" for column in CHARACTER_COLUMNS)
+    update_list = ", ".join(f"{column} = EXCLUDED.{column}" for column in CHARACTER_COLUMNS if column != "url")
+    upsert_query = f"""
+    INSERT INTO characters ({column_list})
+    SELECT DISTINCT ON (url) {column_list} FROM characters_staging WHERE url IS NOT NULL
+    ORDER BY url
+    ON CONFLICT (url) DO UPDATE SET {update_list}, loaded_at = CURRENT_TIMESTAMP;
+    """
+    
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+            CREATE TEMP TABLE IF NOT EXISTS characters_staging
+            ({staging_columns}) ON COMMIT DELETE ROWS;
+            """)
+            cur.copy_expert(f"COPY characters_staging ({column_list}) FROM STDIN",
+                            _to_copy_text(characters))
+            cur.execute(upsert_query)
+            upserted_rows = cur.rowcount
+        conn.commit()
+        return upserted_rows
+    except Exception as e:
+        conn.rollback()
+        module_logger.error(f"Error upserting characters: {e}")
+        raise
+
+
+def _to_copy_text(characters: List[dict]) -> io.StringIO:
+    """Encode characters in the tab separated text format of COPY, None becomes NULL."""
+    buffer = io.StringIO()
+    for character in characters:
+        values = []
+        for column in CHARACTER_COLUMNS:
+            value = character.get(column)
+            if value is None:
+                values.append("\\N")
+            else:
+                values.append(str(value).replace("\\", "\\\\").replace("\t", "\\t")
+                              .replace("\n", "\\n").replace("\r", "\\r"))
+        buffer.write("\t".join(values))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+@profiled("query:create_user")
 def create_user(user: User, conn=None) -> bool:
     """Insert a new user into the database."""
     insert_query = """
@@ -79,6 +250,7 @@ def create_user(user: User, conn=None) -> bool:
             with conn.cursor() as cur:
                 cur.execute(insert_query, (user.name, user.email, user.contact_no))
                 user_id = cur.fetchone()[0]
+                _record_user_change(cur, "insert", user.name, user.email, user.contact_no)
                 conn.commit()
                 module_logger.info(f"User created successfully with ID: {user_id}")
                 return True
@@ -88,6 +260,7 @@ def create_user(user: User, conn=None) -> bool:
                 with conn.cursor() as cur:
                     cur.execute(insert_query, (user.name, user.email, user.contact_no))
                     user_id = cur.fetchone()[0]
+                    _record_user_change(cur, "insert", user.name, user.email, user.contact_no)
                     conn.commit()
                     module_logger.info(f"User created successfully with ID: {user_id}")
                     return True
@@ -99,6 +272,7 @@ def create_user(user: User, conn=None) -> bool:
         raise
 
 
+@profiled("query:get_all_users")
 def get_all_users(conn=None) -> List[User]:
     """Retrieve all users from the database."""
     select_query = "SELECT name, email, contact_no FROM users ORDER BY id;"
@@ -126,6 +300,7 @@ def get_all_users(conn=None) -> List[User]:
         raise
 
 
+@profiled("query:get_user_by_contact_no")
 def get_user_by_contact_no(contact_no: str, conn=None) -> Optional[User]:
     """Retrieve a specific user by contact number."""
     select_query = "SELECT name, email, contact_no FROM users WHERE contact_no = %s;"
@@ -161,15 +336,41 @@ def get_user_by_contact_no(contact_no: str, conn=None) -> Optional[User]:
         raise
 
 
+@profiled("query:get_users_by_contact_nos")
+def get_users_by_contact_nos(contact_nos: List[str], conn=None) -> List[User]:
+    """Retrieve the users having any of the given contact numbers, with a single query."""
+    select_query = "SELECT name, email, contact_no FROM users WHERE contact_no = ANY(%s) ORDER BY id;"
+    
+    try:
+        if conn:
+            # Use provided connection (for dependency injection)
+            with conn.cursor() as cur:
+                cur.execute(select_query, (list(contact_nos),))
+                rows = cur.fetchall()
+        else:
+            # Create new connection (for standalone usage)
+            with get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(select_query, (list(contact_nos),))
+                    rows = cur.fetchall()
+        users = [User(name=row[0], email=row[1], contact_no=row[2]) for row in rows]
+        module_logger.info(f"Found {len(users)} of {len(contact_nos)} users by contact_no.")
+        return users
+    except Exception as e:
+        module_logger.error(f"Error retrieving users by contact_no: {e}")
+        raise
+
+
 def initialize_db_with_sample_data():
     """Create table and populate with sample data from in_memory_store."""
-    from data_store.in_memory_store import temp_user_store
+    from data_store.in_memory_store import get_temp_user_store
     
     try:
         create_users_table()
+        create_user_changes_table()
         
         # Insert sample users
-        for user in temp_user_store:
+        for user in get_temp_user_store():
             create_user(user)
         
         module_logger.info("Database initialized with sample data.")
@@ -180,13 +381,15 @@ def initialize_db_with_sample_data():
 
 def delete_user_by_contact_no(contact_no: str) -> bool:
     """Delete a user by contact number."""
-    delete_query = "DELETE FROM users WHERE contact_no = %s RETURNING id;"
+    delete_query = "DELETE FROM users WHERE contact_no = %s RETURNING name, email;"
     
     try:
         with get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(delete_query, (contact_no,))
                 result = cur.fetchone()
+                if result:
+                    _record_user_change(cur, "delete", result[0], result[1], contact_no)
                 conn.commit()
                 if result:
                     module_logger.info(f"User with contact_no {contact_no} deleted successfully.")
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+
+from data_store import change_feed
+
+
+def _idle_listener(stopped):
+    """Stands in for the database listener, which the hub would otherwise connect in the background."""
+    stopped.wait()
+
+
+def _change(change_id, op="insert"):
+    return {"id": change_id, "op": op, "name": f"Mr.{change_id}", "email": f"{change_id}@mail.com",
+            "contact_no": str(change_id)}
+
+
+def test_hub_fans_out_changes_to_every_subscriber():
+    """Test that one published change reaches all subscribers."""
+    async def scenario():
+        hub = change_feed.ChangeFeedHub(listen=_idle_listener)
+        try:
+            subscriptions = [await hub.subscribe() for _ in range(3)]
+            hub.publish(_change(1))
+            return [subscription.queue.get_nowait() for subscription in subscriptions]
+        finally:
+            hub.stop()
+
+    # Act
+    received = asyncio.run(scenario())
+
+    # Assert
+    assert [change["id"] for change in received] == [1, 1, 1]
+
+
+def test_hub_resumes_from_the_ring_buffer():
+    """Test that a reconnecting subscriber gets the changes after its resume token replayed."""
+    async def scenario():
+        hub = change_feed.ChangeFeedHub(listen=_idle_listener)
+        try:
+            for change_id in range(1, 6):
+                hub.publish(_change(change_id))
+            return await hub.subscribe(last_event_id=3)
+        finally:
+            hub.stop()
+
+    # Act
+    subscription = asyncio.run(scenario())
+
+    # Assert
+    assert [change["id"] for change in subscription.backlog] == [4, 5]
+    assert not subscription.needs_reset
+
+
+def test_hub_drops_subscribers_that_fall_behind():
+    """Test that a full subscriber queue drops that subscriber without blocking the others."""
+    async def scenario():
+        hub = change_feed.ChangeFeedHub(listen=_idle_listener)
+        try:
+            slow = await hub.subscribe()
+            for change_id in range(1, change_feed.SUBSCRIBER_QUEUE_SIZE + 2):
+                hub.publish(_change(change_id))
+            return slow, hub.subscriber_count
+        finally:
+            hub.stop()
+
+    # Act
+    slow, subscriber_count = asyncio.run(scenario())
+
+    # Assert
+    assert slow.dropped
+    assert subscriber_count == 0
+
+
+def test_hub_stops_its_listener_before_restarting():
+    """Test that stop() waits for the listener, so a restart never runs two listeners side by side."""
+    running = []
+
+    def listener(stopped):
+        running.append(threading.get_ident())
+        stopped.wait()
+        running.remove(threading.get_ident())
+
+    async def scenario():
+        hub = change_feed.ChangeFeedHub(listen=listener)
+        hub.start()
+        hub.stop()
+        stopped_listeners = len(running)
+        hub.start()
+        restarted_listeners = len(running)
+        hub.stop()
+        return stopped_listeners, restarted_listeners
+
+    # Act
+    stopped_listeners, restarted_listeners = asyncio.run(scenario())
+
+    # Assert
+    assert stopped_listeners == 0
+    assert restarted_listeners <= 1
+    assert running == []
+
+
+def test_hub_delivers_changes_notified_out_of_order():
+    """Test that a change with a lower id arriving after a higher one is delivered, duplicates are not."""
+    async def scenario():
+        hub = change_feed.ChangeFeedHub(listen=_idle_listener)
+        try:
+            subscription = await hub.subscribe()
+            for change_id in (6, 5, 6):
+                hub._dispatch(_change(change_id))
+            # _dispatch hands the changes to the event loop
+            await asyncio.sleep(0)
+            return [subscription.queue.get_nowait()["id"] for _ in range(subscription.queue.qsize())]
+        finally:
+            hub.stop()
+
+    # Act
+    received = asyncio.run(scenario())
+
+    # Assert
+    assert received == [6, 5]
+
+
+def test_recent_ids_forgets_the_oldest_ids():
+    """Test that the duplicate detection only keeps a bounded number of ids."""
+    # Arrange
+    recent_ids = change_feed.RecentIds(size=2)
+
+    # Act
+    added = [recent_ids.add(change_id) for change_id in (2, 1, 2, 3, 3, 2)]
+
+    # Assert
+    assert added == [True, True, False, True, False, True], "2 was evicted when 3 was added"
@@ -0,0 +1,88 @@
+import json
+import os
+
+import pytest
+
+from data_store import characters_snapshot
+from utils import columnar
+
+
+CHARACTERS = [
+    {"name": "Luke Skywalker", "gender": "male", "eye_color": "blue", "homeworld": "https://swapi.info/api/planets/1"},
+    {"name": "Leia Organa", "gender": "female", "eye_color": "brown", "homeworld": "https://swapi.info/api/planets/2"},
+    {"name": "Owen Lars", "gender": "male", "eye_color": "blue", "homeworld": "https://swapi.info/api/planets/1"},
+    {"name": "Luminara Unduli", "gender": "female", "eye_color": "blue", "homeworld": "https://swapi.info/api/planets/51"},
+]
+
+
+def test_query_combines_secondary_indexes():
+    """Test that filters and the name prefix are intersected case-insensitively."""
+    # Arrange
+    snapshot = characters_snapshot.CharactersSnapshot(CHARACTERS)
+
+    # Act
+    total, items = snapshot.query(filters={"gender": "Male", "eye_color": "blue", "homeworld": None})
+    prefix_total, prefix_items = snapshot.query(name_prefix="LU", filters={"gender": "female"})
+
+    # Assert
+    assert total == 2
+    assert [item["name"] for item in items] == ["Luke Skywalker", "Owen Lars"]
+    assert prefix_total == 1
+    assert prefix_items[0]["name"] == "Luminara Unduli"
+
+
+def test_query_paginates_in_output_order():
+    """Test that offset and limit page through the matches while total counts all of them."""
+    # Arrange
+    snapshot = characters_snapshot.CharactersSnapshot(CHARACTERS)
+
+    # Act
+    total, items = snapshot.query(offset=1, limit=2)
+
+    # Assert
+    assert total == 4
+    assert [item["name"] for item in items] == ["Leia Organa", "Owen Lars"]
+
+
+def test_refresh_snapshot_swaps_only_when_the_output_changes(tmp_path, monkeypatch):
+    """Test that a new output file replaces the snapshot while old references stay intact."""
+    # Arrange: Restored afterwards, so get_snapshot() never serves this test's file elsewhere
+    monkeypatch.setattr(characters_snapshot, "_current_snapshot", None)
+    file_path = tmp_path / "merged_result.json"
+    file_path.write_text(json.dumps(CHARACTERS[:1]))
+    first = characters_snapshot.refresh_snapshot(str(file_path))
+
+    # Act
+    unchanged = characters_snapshot.refresh_snapshot(str(file_path))
+    tmp_file_path = tmp_path / "merged_result.json.tmp"
+    tmp_file_path.write_text(json.dumps(CHARACTERS))
+    os.replace(tmp_file_path, file_path)
+    second = characters_snapshot.refresh_snapshot(str(file_path))
+
+    # Assert
+    assert unchanged is first
+    assert second is not first
+    assert len(first.characters) == 1, "In-flight requests keep their snapshot"
+    assert len(second.characters) == 4
+
+
+def test_refresh_snapshot_reads_columnar_output(tmp_path, monkeypatch):
+    """Test that the snapshot follows the output of the columnar sink too."""
+    # Arrange
+    monkeypatch.setattr(characters_snapshot, "_current_snapshot", None)
+    file_path = tmp_path / "merged_result.col"
+    columnar.write_columnar(CHARACTERS, str(file_path))
+
+    # Act
+    snapshot = characters_snapshot.refresh_snapshot(str(file_path))
+
+    # Assert
+    assert snapshot.query(filters={"gender": "female"})[0] == 2
+
+
+def test_characters_file_path_rejects_unsupported_sinks():
+    """Test that only the file based sinks can be configured as the source of /characters."""
+    # Act & Assert
+    assert characters_snapshot.characters_file_path("columnar").endswith(".col")
+    with pytest.raises(ValueError, match="json, columnar"):
+        characters_snapshot.characters_file_path("postgres")
@@ -0,0 +1,25 @@
+from data_store import postgresql_db_store
+
+
+def test_to_copy_text_escapes_special_characters_and_nulls():
+    """Test that characters are encoded in the COPY text format, one line per character."""
+    # Arrange
+    characters = [
+        {"name": "Back\\slash", "height": "172", "hair_color": "blond\tbrown", "skin_color": "fair\nlight",
+         "eye_color": "blue\rgreen", "url": "https://swapi.dev/api/people/1/"},
+        {"name": "R2-D2"},
+    ]
+
+    # Act
+    lines = postgresql_db_store._to_copy_text(characters).read().split("\n")
+
+    # Assert
+    first = lines[0].split("\t")
+    assert len(lines) == 3 and lines[2] == ""
+    assert len(first) == len(postgresql_db_store.CHARACTER_COLUMNS)
+    assert dict(zip(postgresql_db_store.CHARACTER_COLUMNS, first)) == {
+        "name": "Back\\\\slash", "height": "172", "mass": "\\N", "hair_color": "blond\\tbrown",
+        "skin_color": "fair\\nlight", "eye_color": "blue\\rgreen", "birth_year": "\\N", "gender": "\\N",
+        "homeworld": "\\N", "created": "\\N", "edited": "\\N", "url": "https://swapi.dev/api/people/1/",
+    }
+    assert lines[1].split("\t") == ["R2-D2"] + ["\\N"] * (len(postgresql_db_store.CHARACTER_COLUMNS) - 1)
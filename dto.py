@@ -1,7 +1,59 @@
-from pydantic import BaseModel
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+MAX_LOOKUP_BATCH_SIZE = 1_000  # Contact numbers resolved by one POST /users/lookup
 
 
 class User(BaseModel):
     name: str
     email: str
-    contact_no: str
\ No newline at end of file
+    contact_no: str
+
+
+class UserLookupRequest(BaseModel):
+    contact_nos: List[str] = Field(..., min_length=1, max_length=MAX_LOOKUP_BATCH_SIZE)
+
+
+class UserLookupResult(BaseModel):
+    found: List[User]
+    missing: List[str]
+
+
+class Character(BaseModel):
+    name: str
+    height: Optional[str] = None
+    mass: Optional[str] = None
+    hair_color: Optional[str] = None
+    skin_color: Optional[str] = None
+    eye_color: Optional[str] = None
+    birth_year: Optional[str] = None
+    gender: Optional[str] = None
+    homeworld: Optional[str] = None
+    created: Optional[str] = None
+    edited: Optional[str] = None
+    url: Optional[str] = None
+
+
+class CharacterPage(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    items: List[Character]
+
+
+class ProfilingConfig(BaseModel):
+    enabled: bool = False
+    sample_rate: float = Field(0.01, ge=0, le=1)
+    routes: List[str] = []
+    sampling_interval_ms: float = Field(5, gt=0, le=1000)
+
+
+class SpanStats(BaseModel):
+    route: str
+    name: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
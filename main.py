@@ -1,5 +1,6 @@
 from contextlib import asynccontextmanager
 import asyncio
+import os
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -7,15 +8,31 @@ from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 
 from app_logger import getLogger
+from app_profiler import ProfilingMiddleware, ProfiledJSONResponse, profiler
 from data_store import postgresql_db_store
-from auth.oauth_config import SESSION_SECRET_KEY
+from data_store import characters_snapshot
+from data_store.change_feed import hub as change_feed_hub
+from auth.oauth_config import SESSION_SECRET_KEY, get_oauth_client
 from controllers.user_controllers import router as user_router
+from controllers.character_controllers import router as character_router
+from controllers.profiling_controllers import router as profiling_router
 from controllers.auth_controller import auth_router
 from controllers.static_controllers import static_router
 
 
 module_logger = getLogger()
 
+# "lazy" defers the heavy clients (e.g. the OAuth client) to first use and warms them
+# up in the background once the app is serving, "eager" builds them before serving.
+STARTUP_MODE = os.environ.get("APP_STARTUP_MODE", "lazy")
+
+
+def warm_up():
+    """Builds the lazily initialized clients so the first request does not pay for them."""
+    get_oauth_client()
+    module_logger.info("Warm-up complete.")
+
+
 async def initialize_database_with_retry():
     """Background task to initialize database with retries."""
     max_retries = 10
@@ -37,22 +54,35 @@ async def initialize_database_with_retry():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if STARTUP_MODE == "eager":
+        warm_up()
+        warm_up_task = None
+    else:
+        warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up))
+
     module_logger.info("Starting database initialization in background...")
     # Start background task without awaiting it
     task = asyncio.create_task(initialize_database_with_retry())
+    # Hot-swap the /characters snapshot whenever the ETL pipeline writes a new output
+    snapshot_task = asyncio.create_task(characters_snapshot.watch_snapshot())
     
     yield
     
-    # Cleanup: cancel the task if still running
-    if not task.done():
-        task.cancel()
-        try:
-            await task
-        except asyncio.CancelledError:
-            pass
+    # Cleanup: cancel the tasks if still running
+    for background_task in (task, snapshot_task, warm_up_task):
+        if background_task and not background_task.done():
+            background_task.cancel()
+            try:
+                await background_task
+            except asyncio.CancelledError:
+                pass
+    # Waits for the listener to close its connection, off the event loop
+    await asyncio.to_thread(change_feed_hub.stop)
+    if profiler.enabled:
+        profiler.configure(enabled=False)
     module_logger.info("Shutting down...")
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ProfiledJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -66,8 +96,13 @@ app.add_middleware(
 # Add session middleware for OAuth
 app.add_middleware(SessionMiddleware, secret_key=SESSION_SECRET_KEY)
 
+# Request profiling, switched on at runtime through /admin/profiling
+app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(user_router)
+app.include_router(character_router)
+app.include_router(profiling_router)
 app.include_router(auth_router)
 app.include_router(static_router)
 
@@ -0,0 +1,78 @@
+"""
+Startup benchmark: measures how long importing the application takes in a fresh
+interpreter, which is what every worker, test container stage and scale-out event
+pays before serving, and checks it against a budget.
+
+    python startup_benchmark.py --runs 5 --budget-ms 500
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+
+DEFAULT_RUNS = 5
+DEFAULT_BUDGET_MS = 500
+DEFAULT_TOP = 10
+
+
+def measure_import(module: str = "main"):
+    """
+    Imports the module in a fresh interpreter with -X importtime.
+    Returns the cumulative import time of the module and of each top level import, in ms.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+
+    cumulative_ms = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        # Nesting is shown as two spaces per level, keep what the module imports directly
+        indent = len(name) - len(name.lstrip(" "))
+        if indent <= 3:
+            cumulative_ms[name.strip()] = int(cumulative) / 1000
+
+    return cumulative_ms.pop(module), cumulative_ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import (cold start) time of the app")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Number of slowest imports to list")
+    args = parser.parse_args(argv)
+
+    totals = []
+    imports = {}
+    for _ in range(args.runs):
+        total_ms, import_ms = measure_import(args.module)
+        totals.append(total_ms)
+        for name, cumulative in import_ms.items():
+            imports.setdefault(name, []).append(cumulative)
+
+    median_ms = statistics.median(totals)
+    print(f"Import time of {args.module}: median {median_ms:.1f} ms, "
+          f"min {min(totals):.1f} ms, max {max(totals):.1f} ms over {args.runs} runs")
+
+    print(f"Slowest imports (median cumulative):")
+    slowest = sorted(((statistics.median(times), name) for name, times in imports.items()), reverse=True)
+    for cumulative, name in slowest[:args.top]:
+        print(f"  {cumulative:8.1f} ms  {name}")
+
+    if median_ms > args.budget_ms:
+        print(f"FAILED: {median_ms:.1f} ms exceeds the budget of {args.budget_ms:.0f} ms")
+        return 1
+
+    print(f"OK: within the budget of {args.budget_ms:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import app_profiler
+from app_profiler import ProfiledJSONResponse, ProfilingMiddleware, profiled, span
+
+
+@profiled("query:slow")
+def slow_query():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    return [{"name": "Luke"}]
+
+
+@pytest.fixture
+def client():
+    default_profiler = app_profiler.profiler
+    app_profiler.profiler = app_profiler.Profiler()
+    app = FastAPI(default_response_class=ProfiledJSONResponse)
+    app.add_middleware(ProfilingMiddleware)
+
+    @profiled("get_db")
+    def get_db():
+        return "connection"
+
+    @app.get("/users/{given_cno}")
+    def get_user(given_cno: str, db=Depends(get_db)):
+        return slow_query()
+
+    yield TestClient(app)
+    app_profiler.profiler.configure(enabled=False)
+    app_profiler.profiler = default_profiler
+
+
+def test_span_is_a_no_op_outside_a_profiled_request():
+    """Test that spans record nothing when the request is not profiled."""
+    # Act
+    with span("query:slow") as outside_span:
+        pass
+
+    # Assert
+    assert outside_span is app_profiler._NO_SPAN
+
+
+def test_disabled_profiler_records_nothing(client):
+    """Test that requests are not profiled while profiling is disabled."""
+    # Act
+    response = client.get("/users/123")
+
+    # Assert
+    assert response.json() == [{"name": "Luke"}]
+    assert app_profiler.profiler.summary()["profiled_requests"] == 0
+
+
+def test_profiled_route_records_spans_and_samples(client):
+    """Test that requests of a profiled route record their spans and stack samples per route template."""
+    # Arrange
+    app_profiler.profiler.configure(enabled=True, sample_rate=0, routes=["/users"], sampling_interval=0.001)
+
+    # Act
+    client.get("/users/123")
+    client.get("/users/456")
+
+    # Assert
+    stats = {span_stats["name"]: span_stats for span_stats in app_profiler.profiler.span_stats()}
+    assert set(stats) == {"request", "get_db", "query:slow", "serialization"}
+    assert stats["query:slow"]["count"] == 2
+    assert stats["query:slow"]["route"] == "GET /users/{given_cno}"
+    assert stats["query:slow"]["mean_ms"] >= 50
+
+    folded = app_profiler.profiler.folded_stacks()
+    assert folded.startswith("GET /users/{given_cno};")
+    assert "slow_query (test_app_profiler.py:" in folded
+
+
+def test_sample_rate_selects_other_routes(client):
+    """Test that routes not listed are profiled according to the sample rate only."""
+    # Arrange
+    app_profiler.profiler.configure(enabled=True, sample_rate=0, routes=["/characters"])
+
+    # Act
+    client.get("/users/123")
+
+    # Assert
+    assert app_profiler.profiler.summary()["profiled_requests"] == 0
+    assert app_profiler.profiler.should_profile("/characters/")
+    assert not app_profiler.profiler.should_profile("/admin/profiling/")
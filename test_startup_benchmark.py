@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+import startup_benchmark
+
+
+def test_importing_main_defers_heavy_initialization():
+    """Test that importing the app does not import authlib or requests."""
+    # Arrange
+    check = "import sys, main; print('authlib' in sys.modules, 'requests' in sys.modules)"
+
+    # Act
+    completed = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.abspath(startup_benchmark.__file__)))
+
+    # Assert
+    assert completed.stdout.split() == ["False", "False"]
+
+
+def test_measure_import_reports_total_and_top_level_imports():
+    """Test that the benchmark parses the import time of a module and of what it imports."""
+    # Act
+    total_ms, import_ms = startup_benchmark.measure_import("json")
+
+    # Assert
+    assert total_ms > 0
+    assert "json.decoder" in import_ms
@@ -0,0 +1,324 @@
+"""
+Columnar on-disk format for the extraction cache and the load output.
+
+Layout (all sections start at 8 byte aligned offsets):
+
+  magic          8 bytes   b"CPCOL001"
+  header size    8 bytes   unsigned little endian
+  header         JSON      row count, byte order and per-column section offsets
+  sections       ...       string tables and dictionary codes
+
+Section offsets in the header are relative to the (aligned) end of the header.
+
+A string table is an array of `count + 1` uint64 offsets followed by the UTF-8 bytes
+of all strings. A "plain" column is one string table with a value per row. A "dict"
+column stores every distinct value once in a string table and a uint32 code per row,
+which is what low cardinality columns such as `gender`, `eye_color` or `homeworld`
+use. Values that are not strings are stored as JSON text (column kind "json").
+
+Readers memory-map the file and cast the offset and code sections to memoryviews, so
+reading one column or one record does not parse (or even page in) the rest.
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import argparse
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+
+MAGIC = b"CPCOL001"
+FILE_EXTENSION = ".col"
+ABSENT_CODE = 0xFFFFFFFF  # Dictionary code of a row that does not have the column
+DICT_ENCODING_MAX_RATIO = 0.5  # Distinct values per row up to which a column is dictionary encoded
+DICT_COLUMNS = ("gender", "eye_color", "hair_color", "skin_color", "homeworld")  # Always dictionary encoded
+
+
+def write_columnar(records: Iterable[Dict[str, Any]], file_path: str,
+                   dict_columns: Optional[Sequence[str]] = None) -> int:
+  """
+  Writes records to a columnar file.
+  The file is written to a temporary path first and then atomically replaces the target.
+
+  :param records: Dicts to store. They are materialized, a columnar file is written column by column.
+  :param dict_columns: Columns to dictionary encode. By default DICT_COLUMNS and every other
+                       column with few distinct values (see DICT_ENCODING_MAX_RATIO) are dictionary encoded.
+  :return: Number of records written.
+  """
+  records = list(records)
+  column_names = list(dict.fromkeys(name for record in records for name in record))
+
+  sections = []
+  offset = 0
+  columns_header = []
+
+  for name in column_names:
+    present = [name in record for record in records]
+    values = [record[name] for record in records if name in record]
+    kind = "str" if all(present) and all(isinstance(value, str) for value in values) else "json"
+
+    encoded = [_encode(record.get(name), kind) if is_present else None
+               for record, is_present in zip(records, present)]
+    distinct = dict.fromkeys(value for value in encoded if value is not None)
+
+    if dict_columns is not None:
+      use_dict = name in dict_columns
+    else:
+      use_dict = name in DICT_COLUMNS or len(distinct) <= max(1, int(len(records) * DICT_ENCODING_MAX_RATIO))
+
+    column_header = {"name": name, "kind": kind, "encoding": "dict" if use_dict else "plain"}
+    if use_dict:
+      code_of = {value: code for code, value in enumerate(distinct)}
+      column_header["dictionary"], offset = _add_string_table(sections, list(distinct), offset)
+      codes = array("I", (code_of[value] if value is not None else ABSENT_CODE for value in encoded))
+      column_header["codes"], offset = _add_section(sections, codes.tobytes(), offset)
+    else:
+      # Absent values only occur in "json" columns, where an empty string is never valid JSON
+      strings = [value if value is not None else "" for value in encoded]
+      column_header["values"], offset = _add_string_table(sections, strings, offset)
+
+    columns_header.append(column_header)
+
+  header = {"num_rows": len(records), "byteorder": sys.byteorder, "columns": columns_header}
+  header_bytes = json.dumps(header).encode("utf8")
+  data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+  tmp_file_path = f"{file_path}.tmp"
+  with open(tmp_file_path, "wb") as columnar_file:
+    columnar_file.write(MAGIC)
+    columnar_file.write(struct.pack("<Q", len(header_bytes)))
+    columnar_file.write(header_bytes)
+    for section in sections:
+      # Zero padding up to the aligned start of the section
+      columnar_file.write(b"\0" * (data_start + section["offset"] - columnar_file.tell()))
+      columnar_file.write(section["data"])
+  os.replace(tmp_file_path, file_path)
+
+  return len(records)
+
+
+class Column:
+  """Read-only, lazily decoded sequence of the values of one column."""
+
+  def __init__(self, columnar_file: "ColumnarFile", header: Dict[str, Any]):
+    self.name = header["name"]
+    self.kind = header["kind"]
+    self.encoding = header["encoding"]
+    self._num_rows = columnar_file.num_rows
+
+    if self.encoding == "dict":
+      self._dictionary_table = _StringTable(columnar_file._sections, header["dictionary"])
+      self._dictionary = None
+      self.codes = columnar_file._sections[header["codes"]:header["codes"] + 4 * self._num_rows].cast("I")
+    else:
+      self._values = _StringTable(columnar_file._sections, header["values"])
+
+  @property
+  def dictionary(self) -> List[Any]:
+    """Distinct values of a dictionary encoded column, indexed by code."""
+    if self._dictionary is None:
+      self._dictionary = [self._decode(self._dictionary_table[code]) for code in range(len(self._dictionary_table))]
+    return self._dictionary
+
+  def is_present(self, row: int) -> bool:
+    if self.encoding == "dict":
+      return self.codes[row] != ABSENT_CODE
+    return self.kind == "str" or self._values.length(row) > 0
+
+  def __len__(self) -> int:
+    return self._num_rows
+
+  def __getitem__(self, row: int) -> Any:
+    """Returns the value of a row, None if the row does not have the column."""
+    if row < 0:
+      row += self._num_rows
+    if not 0 <= row < self._num_rows:
+      raise IndexError(f"Row {row} out of range")
+
+    if self.encoding == "dict":
+      code = self.codes[row]
+      return None if code == ABSENT_CODE else self.dictionary[code]
+
+    if not self.is_present(row):
+      return None
+    return self._decode(self._values[row])
+
+  def __iter__(self) -> Iterator[Any]:
+    for row in range(self._num_rows):
+      yield self[row]
+
+  def _decode(self, text: str) -> Any:
+    return text if self.kind == "str" else json.loads(text)
+
+
+class ColumnarFile:
+  """
+  Memory-mapped reader of a columnar file.
+
+    with ColumnarFile("./data/merged_result.col") as characters:
+      genders = characters.column("gender")
+      luke = characters.record(0)
+  """
+
+  def __init__(self, file_path: str):
+    self.file_path = file_path
+    self._column_cache: Dict[str, Column] = {}
+    self._sections = None
+    self._file = open(file_path, "rb")
+    try:
+      self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+      self._file.close()
+      raise ValueError(f"Not a columnar file: {file_path}")
+
+    self._buffer = memoryview(self._mmap)
+    if bytes(self._buffer[:len(MAGIC)]) != MAGIC:
+      self.close()
+      raise ValueError(f"Not a columnar file: {file_path}")
+
+    header_size, = struct.unpack_from("<Q", self._buffer, len(MAGIC))
+    header_start = len(MAGIC) + 8
+    self.header = json.loads(bytes(self._buffer[header_start:header_start + header_size]))
+    self._sections = self._buffer[_align(header_start + header_size):]
+    if self.header["byteorder"] != sys.byteorder:
+      self.close()
+      raise ValueError(f"{file_path} was written on a {self.header['byteorder']} endian machine")
+
+    self.num_rows = self.header["num_rows"]
+    self.columns = [column_header["name"] for column_header in self.header["columns"]]
+    self._column_headers = {column_header["name"]: column_header for column_header in self.header["columns"]}
+
+  def column(self, name: str) -> Column:
+    if name not in self._column_cache:
+      if name not in self._column_headers:
+        raise KeyError(f"Unknown column: {name}")
+      self._column_cache[name] = Column(self, self._column_headers[name])
+    return self._column_cache[name]
+
+  def record(self, row: int) -> Dict[str, Any]:
+    """Returns one record, without the columns the record did not have."""
+    result = {}
+    for name in self.columns:
+      column = self.column(name)
+      if column.is_present(row):
+        result[name] = column[row]
+    return result
+
+  def __len__(self) -> int:
+    return self.num_rows
+
+  def __iter__(self) -> Iterator[Dict[str, Any]]:
+    for row in range(self.num_rows):
+      yield self.record(row)
+
+  def close(self) -> None:
+    # The memoryviews handed out have to be released before the map can be closed
+    for column in self._column_cache.values():
+      if column.encoding == "dict":
+        column.codes.release()
+        column._dictionary_table.release()
+      else:
+        column._values.release()
+    self._column_cache = {}
+    if self._sections is not None:
+      self._sections.release()
+    self._buffer.release()
+    try:
+      self._mmap.close()
+    except BufferError:
+      # A caller still holds a view (e.g. Column.codes), the map is closed once it is gone
+      pass
+    self._file.close()
+
+  def __enter__(self) -> "ColumnarFile":
+    return self
+
+  def __exit__(self, *exc_info) -> None:
+    self.close()
+
+
+def iter_columnar_records(file_path: str) -> Iterator[Dict[str, Any]]:
+  """Yields the records of a columnar file one at a time."""
+  with ColumnarFile(file_path) as columnar_file:
+    yield from columnar_file
+
+
+def json_to_columnar(json_file_path: str, columnar_file_path: str,
+                     dict_columns: Optional[Sequence[str]] = None) -> int:
+  """Converts a JSON (array or NDJSON) file of records to a columnar file."""
+  from utils.helper_functions import iter_json_records
+
+  return write_columnar(iter_json_records(json_file_path), columnar_file_path, dict_columns=dict_columns)
+
+
+def columnar_to_json(columnar_file_path: str, json_file_path: str) -> int:
+  """Converts a columnar file back to a JSON array (or an NDJSON file for `.ndjson` paths)."""
+  from utils.load import execute_stream
+
+  return execute_stream(iter_columnar_records(columnar_file_path), json_file_path)
+
+
+class _StringTable:
+  def __init__(self, buffer: memoryview, header: Dict[str, int]):
+    self._count = header["count"]
+    self._offsets = buffer[header["offsets"]:header["offsets"] + 8 * (self._count + 1)].cast("Q")
+    self._data = buffer[header["data"]:header["data"] + header["data_length"]]
+
+  def __len__(self) -> int:
+    return self._count
+
+  def __getitem__(self, index: int) -> str:
+    return str(self._data[self._offsets[index]:self._offsets[index + 1]], "utf8")
+
+  def length(self, index: int) -> int:
+    return self._offsets[index + 1] - self._offsets[index]
+
+  def release(self) -> None:
+    self._offsets.release()
+    self._data.release()
+
+
+def _encode(value: Any, kind: str) -> str:
+  return value if kind == "str" else json.dumps(value)
+
+
+def _align(offset: int) -> int:
+  return (offset + 7) & ~7
+
+
+def _add_section(sections: list, data: bytes, offset: int):
+  offset = _align(offset)
+  sections.append({"offset": offset, "data": data})
+  return offset, offset + len(data)
+
+
+def _add_string_table(sections: list, strings: List[str], offset: int):
+  encoded = [string.encode("utf8") for string in strings]
+  offsets = array("Q", [0])
+  for string_bytes in encoded:
+    offsets.append(offsets[-1] + len(string_bytes))
+
+  offsets_offset, offset = _add_section(sections, offsets.tobytes(), offset)
+  data = b"".join(encoded)
+  data_offset, offset = _add_section(sections, data, offset)
+  return {"count": len(strings), "offsets": offsets_offset, "data": data_offset, "data_length": len(data)}, offset
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Convert record files between JSON and the columnar format")
+  parser.add_argument("direction", choices=["to-columnar", "to-json"])
+  parser.add_argument("source")
+  parser.add_argument("target")
+  args = parser.parse_args(argv)
+
+  if args.direction == "to-columnar":
+    total_records = json_to_columnar(args.source, args.target)
+  else:
+    total_records = columnar_to_json(args.source, args.target)
+  print(f"Converted {total_records} records from {args.source} to {args.target}")
+
+if __name__ == "__main__":
+  main()
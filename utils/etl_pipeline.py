@@ -1,24 +1,187 @@
-import extract
-import transform
-import load
+import os
+import argparse
+import itertools
 
+from utils import extract
+from utils import transform
+from utils import load
+from utils import incremental
+from utils import orchestrator
+from utils.helper_functions import iter_records
 
-def run_pipeline():
-  postfix_msg = "Phase End. Beginning next phase ..."
 
-  # Step 1
-  result = extract.execute()
-  print(f"Extraction {postfix_msg}")
+def run_pipeline(streaming: bool = False, incremental_run: bool = False, workers: int = 1,
+                 sink: str = "json", sink_options: dict = None, cache_format: str = "json"):
+  """
+  Runs Extraction, Transformation and Load as a DAG of stages (see utils/orchestrator.py)
+  and prints the wall time, record count and throughput of every stage.
+  """
+  if incremental_run:
+    pipeline = build_incremental_pipeline(workers=workers, sink=sink, sink_options=sink_options,
+                                          cache_format=cache_format)
+  elif streaming:
+    pipeline = build_streaming_pipeline(workers=workers, sink=sink, sink_options=sink_options,
+                                        cache_format=cache_format)
+  else:
+    pipeline = build_batch_pipeline(workers=workers, sink=sink, sink_options=sink_options,
+                                    cache_format=cache_format)
 
-  # Step 2
-  result = transform.execute(*result)
-  print(f"Transformation {postfix_msg}")
+  metrics = pipeline.run()
 
-  # Step 3
-  result = load.execute(result)
-  print(f"Load Phase {postfix_msg}")
+  for line in orchestrator.format_metrics(metrics):
+    print(line)
+  print(f"Pipeline Complete. Loaded {metrics['load'].result} records.")
+  return metrics
 
-  print("Pipeline Complete.")
+
+def build_batch_pipeline(workers: int = 1, sink: str = "json", sink_options: dict = None,
+                         cache_format: str = "json",
+                         queue_size: int = orchestrator.DEFAULT_QUEUE_SIZE) -> orchestrator.Pipeline:
+  """
+  Builds the default pipeline as a DAG.
+  Both sources are extracted concurrently (from the cache files, or the APIs on a cache
+  miss) and joined in memory, the merged persons are then validated and loaded.
+  """
+  sink_options = sink_options or {}
+
+  pipeline = orchestrator.Pipeline(queue_size=queue_size)
+  pipeline.add_stage("extract_base", lambda: extract.execute_source("base", cache_format=cache_format))
+  pipeline.add_stage("extract_latest", lambda: extract.execute_source("latest", cache_format=cache_format))
+  pipeline.add_stage("transform", lambda base, latest: transform.execute(list(base), list(latest)),
+                     deps=["extract_base", "extract_latest"])
+  pipeline.add_stage("validate", lambda merged: transform.normalize(list(merged), workers=workers)[0],
+                     deps=["transform"])
+  pipeline.add_stage("load", lambda normalized: _load_unless_empty(normalized, sink, sink_options),
+                     deps=["validate"])
+  return pipeline
+
+
+def build_streaming_pipeline(workers: int = 1, sink: str = "json", sink_options: dict = None,
+                             cache_format: str = "json",
+                             queue_size: int = orchestrator.DEFAULT_QUEUE_SIZE) -> orchestrator.Pipeline:
+  """
+  Builds the constant memory variant of the pipeline as a DAG.
+  Both extractions run concurrently and records flow one at a time from the cache
+  files, through the transformation and into the sink, so peak memory does not
+  depend on the input size and every stage starts before its upstream finishes.
+  """
+  sink_options = sink_options or {}
+  base_result, latest_result = extract.execute_stream(cache_format=cache_format)
+
+  pipeline = orchestrator.Pipeline(queue_size=queue_size)
+  pipeline.add_stage("extract_base", lambda: base_result)
+  pipeline.add_stage("extract_latest", lambda: latest_result)
+  pipeline.add_stage("transform", transform.execute_stream, deps=["extract_base", "extract_latest"])
+  pipeline.add_stage("validate", lambda merged: transform.normalize_stream(merged, workers=workers),
+                     deps=["transform"])
+  pipeline.add_stage("load", lambda normalized: _load_unless_empty(normalized, sink, sink_options),
+                     deps=["validate"])
+  return pipeline
+
+
+def build_incremental_pipeline(workers: int = 1, sink: str = "json", sink_options: dict = None,
+                               cache_format: str = "json",
+                               queue_size: int = orchestrator.DEFAULT_QUEUE_SIZE) -> orchestrator.Pipeline:
+  """
+  Builds the pipeline processing only the persons that are new or changed since the
+  last completed run, and merging them into the existing output. Every stage after the
+  extraction is checkpointed, so a run that crashed resumes from the last completed stage.
+  """
+  sink_options = sink_options or {}
+  state = incremental.load_state()
+  selected = {}
+
+  def select_stage(base_result, latest_result):
+    def select_changed():
+      base_list, latest_list = list(base_result), list(latest_result)
+      if not base_list and not latest_list:
+        # Most likely a failed extraction, which must not reset the state of every person
+        print("Nothing extracted, keeping the existing output and state.")
+        return {"base": [], "latest": [], "state": state}
+
+      base_changed, latest_changed, pending_state = incremental.select_changed(
+        base_list, latest_list, state, key_func=transform.person_id)
+      return {"base": base_changed, "latest": latest_changed, "state": pending_state}
+
+    selected.update(incremental.run_stage("extract", select_changed))
+    # Tagged with their source, the join needs both sides separately
+    for source_name in ("base", "latest"):
+      for record in selected[source_name]:
+        yield source_name, record
+
+  def transform_stage(changed):
+    changed_by_source = {"base": [], "latest": []}
+    for source_name, record in changed:
+      changed_by_source[source_name].append(record)
+
+    return incremental.run_stage(
+      "transform", lambda: transform.normalize(transform.execute(changed_by_source["base"],
+                                                                 changed_by_source["latest"]),
+                                               workers=workers)[0])
+
+  def load_stage(merged_results):
+    merged_result = list(merged_results)
+
+    def load_changes():
+      if sink not in load.SINK_FILE_PATHS:
+        # Database sinks upsert by key, so only the changed persons have to be loaded
+        return load.execute_sink(merged_result, sink, **sink_options)
+
+      result_file_path = load.SINK_FILE_PATHS[sink]
+      existing_result = []
+      if os.path.exists(result_file_path):
+        existing_result = iter_records(result_file_path)
+      output = incremental.merge_into_output(existing_result, merged_result, key_func=transform.person_id)
+      return load.execute_sink(output, sink, result_file_path=result_file_path)
+
+    result = incremental.run_stage("load", load_changes)
+
+    # Only advance the watermark once the output contains every change
+    incremental.save_state(selected["state"])
+    incremental.clear_checkpoints()
+    return result
+
+  pipeline = orchestrator.Pipeline(queue_size=queue_size)
+  pipeline.add_stage("extract_base", lambda: extract.execute_source("base", cache_format=cache_format))
+  pipeline.add_stage("extract_latest", lambda: extract.execute_source("latest", cache_format=cache_format))
+  pipeline.add_stage("select", select_stage, deps=["extract_base", "extract_latest"])
+  pipeline.add_stage("transform", transform_stage, deps=["select"])
+  pipeline.add_stage("load", load_stage, deps=["transform"])
+  return pipeline
+
+
+def _load_unless_empty(records, sink: str, sink_options: dict) -> int:
+  """
+  Loads the records into the sink, unless there are none: an empty result (e.g. after a
+  failed extraction) must not replace the output of the last successful run.
+  """
+  records_iter = iter(records)
+  first_record = next(records_iter, None)
+  if first_record is None:
+    print("Nothing to load, keeping the existing output.")
+    return 0
+  return load.execute_sink(itertools.chain([first_record], records_iter), sink, **sink_options)
+
+
+def main(argv=None):
+  """
+  Command line entry point, run it from the project root: `python -m utils.etl_pipeline`.
+  """
+  parser = argparse.ArgumentParser(prog="python -m utils.etl_pipeline", description="Star Wars characters ETL pipeline")
+  parser.add_argument("--stream", action="store_true",
+                      help="Run the stages concurrently as a streaming DAG with constant memory usage")
+  parser.add_argument("--incremental", action="store_true", help="Only process new or changed persons")
+  parser.add_argument("--workers", type=int, default=1, help="Processes used to validate the merged persons")
+  parser.add_argument("--sink", choices=sorted(load.SINKS), default="json", help="Where the load phase writes to")
+  parser.add_argument("--cache-format", choices=sorted(extract.CACHE_FILE_PATHS), default="json",
+                      help="File format of the extraction cache")
+  parser.add_argument("--batch-size", type=int, default=load.POSTGRES_BATCH_SIZE,
+                      help="Records per transaction for the postgres sink")
+  args = parser.parse_args(argv)
+
+  sink_options = {"batch_size": args.batch_size} if args.sink == "postgres" else {}
+  run_pipeline(streaming=args.stream, incremental_run=args.incremental, workers=args.workers,
+               sink=args.sink, sink_options=sink_options, cache_format=args.cache_format)
 
 if __name__ == "__main__":
-  run_pipeline()
+  main()
@@ -1,4 +1,6 @@
-from helper_functions import fetch_data_if_not_cached
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.helper_functions import fetch_data_if_not_cached, stream_data_if_not_cached
 
 
 BASE_URL = "https://swapi.tech/api/people"
@@ -7,18 +9,60 @@ LATEST_URL = "https://swapi.info/api/people"
 BASE_RESULT_FILE_PATH = "./data/base_result.json"
 LATEST_RESULT_FILE_PATH = "./data/latest_result.json"
 
+# Cache files per cache format, see utils/columnar.py for the columnar one
+CACHE_FILE_PATHS = {
+  "json": (BASE_RESULT_FILE_PATH, LATEST_RESULT_FILE_PATH),
+  "columnar": ("./data/base_result.col", "./data/latest_result.col"),
+}
+
+
+# API URL, index in CACHE_FILE_PATHS and extraction of the person dicts from the response, per source
+SOURCES = {
+  "base": (BASE_URL, 0, lambda inp: inp.get("results", [])),
+  "latest": (LATEST_URL, 1, lambda inp: inp),
+}
+
+
+def execute_source(source_name: str, cache_format: str = "json") -> list:
+  """Extracts the person dicts of one source ("base" or "latest"), from its cache file if present."""
+  url_to_fetch, cache_index, get_relevant_result_callback = SOURCES[source_name]
+  result = fetch_data_if_not_cached(url_to_fetch=url_to_fetch,
+                                    result_file_path=CACHE_FILE_PATHS[cache_format][cache_index],
+                                    get_relevant_result_callback=get_relevant_result_callback)
+
+  print(f"Total Person Dicts in {source_name.upper()}: {len(result)}")
+  return result
+
+
+def execute(cache_format: str = "json"):
+  # Both extractions are independent, so they are fetched (or read from cache) concurrently
+  with ThreadPoolExecutor(max_workers=2) as executor:
+    # Get results from the OLD API
+    base_future = executor.submit(execute_source, "base", cache_format)
+
+    # Get results from the NEW API
+    latest_future = executor.submit(execute_source, "latest", cache_format)
+
+    base_result: list = base_future.result()
+    latest_result: list = latest_future.result()
+
+  return base_result, latest_result
+
+
+def execute_stream(cache_format: str = "json"):
+  """
+  Streaming variant of execute.
+  Returns two generators that yield the person dicts of the BASE and LATEST
+  sources one by one instead of two fully loaded lists.
+  """
+  base_file_path, latest_file_path = CACHE_FILE_PATHS[cache_format]
 
-def execute():
-  # Get results from the OLD API
-  base_result: list = fetch_data_if_not_cached(url_to_fetch=BASE_URL, 
-                                                result_file_path=BASE_RESULT_FILE_PATH,
-                                                get_relevant_result_callback=lambda inp: inp.get("results", []))
+  base_result = stream_data_if_not_cached(url_to_fetch=BASE_URL, 
+                                          result_file_path=base_file_path,
+                                          get_relevant_result_callback=lambda inp: inp.get("results", []))
 
-  # Get results from the NEW API
-  latest_result: list = fetch_data_if_not_cached(url_to_fetch=LATEST_URL, 
-                                                  result_file_path=LATEST_RESULT_FILE_PATH,
-                                                  get_relevant_result_callback=lambda inp: inp)
+  latest_result = stream_data_if_not_cached(url_to_fetch=LATEST_URL, 
+                                            result_file_path=latest_file_path,
+                                            get_relevant_result_callback=lambda inp: inp)
 
-  print(f"Total Person Dicts in BASE: {len(base_result)}")
-  print(f"Total Person Dicts in LATEST: {len(latest_result)}")
-  return base_result, latest_result
\ No newline at end of file
+  return base_result, latest_result
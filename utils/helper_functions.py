@@ -2,28 +2,154 @@ import os
 import json
 import traceback
 
-import requests
+from utils import columnar
+
+
+STREAM_CHUNK_SIZE = 64 * 1024  # Characters read from disk per chunk while streaming
 
 
 def fetch_data_if_not_cached(url_to_fetch, result_file_path, get_relevant_result_callback):
   result: list = []
   
   try:
+    _build_columnar_cache_from_json(result_file_path)
+
     if not os.path.exists(result_file_path):
+      # Only needed on a cache miss, so it is not imported by readers of the cache
+      import requests
+
       response = requests.get(url_to_fetch)
       print(f"Got the response from: {url_to_fetch}")
       
       # result = response.json().get("results", [])
       result = get_relevant_result_callback(response.json())
       # TODO: Temporary and should be removed once implementation is done.
-      with open(result_file_path, "w") as result_file:
-        json.dump(result, result_file, indent=2)
+      if is_columnar_path(result_file_path):
+        columnar.write_columnar(result, result_file_path)
+      else:
+        with open(result_file_path, "w") as result_file:
+          json.dump(result, result_file, indent=2)
 
     else:
       print(f"Reading from the cached file: {result_file_path}")
-      with open(result_file_path, "r") as result_file:
-        result = json.load(result_file)
+      if is_columnar_path(result_file_path):
+        result = list(columnar.iter_columnar_records(result_file_path))
+      else:
+        with open(result_file_path, "r") as result_file:
+          result = json.load(result_file)
   except Exception:
     print(f"Error in fetching the request. {traceback.format_exc()}")
   
-  return result
\ No newline at end of file
+  return result
+
+
+def stream_data_if_not_cached(url_to_fetch, result_file_path, get_relevant_result_callback):
+  """
+  Streaming counterpart of fetch_data_if_not_cached.
+  Makes sure the cache file exists and then yields its records one at a time,
+  so the whole file is never held in memory.
+  """
+  _build_columnar_cache_from_json(result_file_path)
+
+  if not os.path.exists(result_file_path):
+    # The API responses are small; only the cached file can grow large.
+    fetch_data_if_not_cached(url_to_fetch, result_file_path, get_relevant_result_callback)
+
+  if os.path.exists(result_file_path):
+    print(f"Streaming from the cached file: {result_file_path}")
+    yield from iter_records(result_file_path)
+
+
+def is_columnar_path(file_path) -> bool:
+  return file_path.endswith(columnar.FILE_EXTENSION)
+
+
+def _build_columnar_cache_from_json(result_file_path):
+  """
+  On a miss of a columnar cache file, builds it from the JSON cache file of the same
+  source (e.g. base_result.json for base_result.col) instead of calling the API again.
+  """
+  if not is_columnar_path(result_file_path) or os.path.exists(result_file_path):
+    return
+
+  json_file_path = os.path.splitext(result_file_path)[0] + ".json"
+  if os.path.exists(json_file_path):
+    print(f"Building {result_file_path} from the cached file: {json_file_path}")
+    columnar.json_to_columnar(json_file_path, result_file_path)
+
+
+def iter_records(file_path):
+  """Yields the records of a JSON, NDJSON or columnar file one at a time."""
+  if is_columnar_path(file_path):
+    return columnar.iter_columnar_records(file_path)
+  return iter_json_records(file_path)
+
+
+def iter_json_records(file_path, chunk_size=STREAM_CHUNK_SIZE):
+  """
+  Incrementally parse the records of a JSON array file or an NDJSON file.
+
+  The file is read in chunks and each top level value is decoded as soon as it is
+  complete, so peak memory is bounded by the largest single record.
+
+  :param file_path: Path of a `.json` file holding an array or a `.ndjson` file.
+  :param chunk_size: Number of characters read per chunk.
+  """
+  decoder = json.JSONDecoder()
+
+  with open(file_path, "r") as input_file:
+    buffer = ""
+    position = 0
+    eof = False
+    started = False
+    is_array = False
+
+    def read_more():
+      nonlocal buffer, position, eof
+      chunk = input_file.read(chunk_size)
+      if not chunk:
+        eof = True
+        return
+      # Drop the already consumed prefix so the buffer does not grow unbounded
+      buffer = buffer[position:] + chunk
+      position = 0
+
+    while True:
+      # Skip whitespace and the separators between records
+      while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n" + ("," if started else ""):
+          position += 1
+        if position < len(buffer) or eof:
+          break
+        read_more()
+
+      if position >= len(buffer):
+        if is_array:
+          raise ValueError(f"Unterminated JSON array in {file_path}")
+        return
+
+      if not started:
+        started = True
+        if buffer[position] == "[":
+          is_array = True
+          position += 1
+        continue
+
+      if is_array and buffer[position] == "]":
+        return
+
+      try:
+        record, end = decoder.raw_decode(buffer, position)
+      except json.JSONDecodeError:
+        if eof:
+          raise
+        read_more()
+        continue
+
+      if end == len(buffer) and not eof:
+        # A scalar such as a number may continue in the next chunk
+        read_more()
+        continue
+
+      position = end
+      yield record
@@ -0,0 +1,135 @@
+import os
+import json
+import hashlib
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+
+STATE_FILE_PATH = "./data/etl_state.json"
+CHECKPOINT_DIR_PATH = "./data/checkpoints"
+
+
+def record_hash(record: Dict[str, Any]) -> str:
+  """Returns a content hash of a record that does not depend on its key order."""
+  canonical = json.dumps(record, sort_keys=True, separators=(",", ":"))
+  return hashlib.sha256(canonical.encode("utf8")).hexdigest()
+
+
+def load_state(state_file_path: str = STATE_FILE_PATH) -> Dict[str, Any]:
+  """
+  Returns the state of the last successful run: the `edited` watermark and the
+  content hash of every record seen so far, per source.
+  """
+  if not os.path.exists(state_file_path):
+    return {"watermark": None, "hashes": {"base": {}, "latest": {}}}
+
+  with open(state_file_path, "r") as state_file:
+    return json.load(state_file)
+
+
+def save_state(state: Dict[str, Any], state_file_path: str = STATE_FILE_PATH) -> None:
+  _write_json_atomically(state, state_file_path)
+
+
+def select_changed(base_result: List[Dict[str, Any]],
+                   latest_result: List[Dict[str, Any]],
+                   state: Dict[str, Any],
+                   key_func: Callable[[Dict[str, Any]], Optional[str]]) -> Tuple[list, list, Dict[str, Any]]:
+  """
+  Filters both sources down to the persons that are new or changed since the last run.
+
+  A record whose `edited` timestamp is not newer than the watermark and whose key is
+  already known is considered unchanged without hashing it. Every other record is
+  hashed and compared with the stored hash, which also catches changes in sources
+  without an `edited` field. When a person changed in one source, its record from
+  the other source is kept as well so the join can still pair them.
+
+  :return: The changed BASE records, the changed LATEST records and the state to
+           save once the run has completed.
+  """
+  watermark = state.get("watermark")
+  changed_keys = set()
+  new_state = {"watermark": watermark, "hashes": {}}
+
+  for source_name, records in (("base", base_result), ("latest", latest_result)):
+    old_hashes = state.get("hashes", {}).get(source_name, {})
+    new_hashes = {}
+
+    for record in records:
+      record_key = key_func(record)
+      if record_key is None:
+        continue
+
+      edited = record.get("edited")
+      if edited and watermark and edited <= watermark and record_key in old_hashes:
+        new_hashes[record_key] = old_hashes[record_key]
+        continue
+
+      new_hashes[record_key] = record_hash(record)
+      if old_hashes.get(record_key) != new_hashes[record_key]:
+        changed_keys.add(record_key)
+
+      if edited and (new_state["watermark"] is None or edited > new_state["watermark"]):
+        new_state["watermark"] = edited
+
+    new_state["hashes"][source_name] = new_hashes
+
+  base_changed = [record for record in base_result if key_func(record) in changed_keys]
+  latest_changed = [record for record in latest_result if key_func(record) in changed_keys]
+
+  print(f"Incremental run: {len(changed_keys)} new or changed persons since watermark {watermark}.")
+  return base_changed, latest_changed, new_state
+
+
+def merge_into_output(existing_result: List[Dict[str, Any]],
+                      changed_result: List[Dict[str, Any]],
+                      key_func: Callable[[Dict[str, Any]], Optional[str]]) -> List[Dict[str, Any]]:
+  """
+  Upserts the changed records into the existing output by key.
+  Existing records keep their position, new records are appended at the end.
+  """
+  changed_by_key = {key_func(record): record for record in changed_result}
+
+  merged_result = []
+  for record in existing_result:
+    merged_result.append(changed_by_key.pop(key_func(record), record))
+
+  merged_result.extend(changed_by_key.values())
+  return merged_result
+
+
+def run_stage(stage_name: str, stage_callback: Callable[[], Any],
+              checkpoint_dir_path: str = CHECKPOINT_DIR_PATH) -> Any:
+  """
+  Runs a pipeline stage and checkpoints its result.
+  If a previous (crashed) run already completed this stage, its checkpointed result
+  is returned instead of running the stage again.
+  """
+  checkpoint_file_path = os.path.join(checkpoint_dir_path, f"{stage_name}.json")
+
+  if os.path.exists(checkpoint_file_path):
+    print(f"Resuming {stage_name} from checkpoint: {checkpoint_file_path}")
+    with open(checkpoint_file_path, "r") as checkpoint_file:
+      return json.load(checkpoint_file)
+
+  result = stage_callback()
+
+  os.makedirs(checkpoint_dir_path, exist_ok=True)
+  _write_json_atomically(result, checkpoint_file_path)
+  return result
+
+
+def clear_checkpoints(checkpoint_dir_path: str = CHECKPOINT_DIR_PATH) -> None:
+  """Removes the checkpoints once a run has completed every stage."""
+  if not os.path.isdir(checkpoint_dir_path):
+    return
+
+  for file_name in os.listdir(checkpoint_dir_path):
+    if file_name.endswith(".json"):
+      os.remove(os.path.join(checkpoint_dir_path, file_name))
+
+
+def _write_json_atomically(data, file_path: str) -> None:
+  tmp_file_path = f"{file_path}.tmp"
+  with open(tmp_file_path, "w") as tmp_file:
+    json.dump(data, tmp_file)
+  os.replace(tmp_file_path, file_path)
@@ -1,7 +1,14 @@
+import os
 import json
+import time
+import itertools
 import traceback
 
+from utils import columnar
+
 RESULT_FILE_PATH = "./data/merged_result.json"
+COLUMNAR_RESULT_FILE_PATH = "./data/merged_result.col"
+POSTGRES_BATCH_SIZE = 5_000
 
 def execute(merged_result_list: list) -> None:
   """
@@ -17,3 +24,128 @@ def execute(merged_result_list: list) -> None:
     print(f"Unable to write merged result to file: {RESULT_FILE_PATH}")
   except Exception:
     print("Something went wrong!", traceback.format_exc())
+
+
+def execute_stream(merged_results, result_file_path: str = RESULT_FILE_PATH) -> int:
+  """
+  Load the results to a file one record at a time.
+
+  A `.ndjson` path gets one JSON document per line, anything else gets a JSON array.
+  The output is written to a temporary file which replaces the target only once
+  every record has been written, so readers never see a half written file.
+
+  :param merged_results: Iterable (e.g. a generator) of dicts with merged results.
+  :param result_file_path: Path of the output file.
+  :return: Number of records written.
+  """
+  is_ndjson = result_file_path.endswith(".ndjson")
+  tmp_file_path = f"{result_file_path}.tmp"
+  total_records = 0
+
+  try:
+    with open(tmp_file_path, "w") as result_file:
+      if not is_ndjson:
+        result_file.write("[")
+
+      for record in merged_results:
+        if is_ndjson:
+          result_file.write(json.dumps(record))
+          result_file.write("\n")
+        else:
+          result_file.write(",\n  " if total_records else "\n  ")
+          result_file.write(json.dumps(record, indent=2).replace("\n", "\n  "))
+        total_records += 1
+
+      if not is_ndjson:
+        result_file.write("\n]" if total_records else "]")
+
+    os.replace(tmp_file_path, result_file_path)
+  except FileNotFoundError:
+    print(f"Unable to write merged result to file: {result_file_path}")
+  except Exception:
+    print("Something went wrong!", traceback.format_exc())
+  finally:
+    if os.path.exists(tmp_file_path):
+      os.remove(tmp_file_path)
+
+  return total_records
+
+
+def execute_postgres(merged_results, batch_size: int = POSTGRES_BATCH_SIZE) -> int:
+  """
+  Load the results into the `characters` table of the application database.
+
+  Uses the connection settings of data_store.postgresql_db_store. Every batch is
+  copied into a staging table and upserted by `url` in its own transaction, so a
+  failing batch never leaves a partial batch behind.
+
+  :param merged_results: Iterable (e.g. a generator) of dicts with merged results.
+  :param batch_size: Number of records per COPY and transaction.
+  :return: Number of rows inserted or updated.
+  """
+  # Imported here so the file based sinks work without a database driver
+  from data_store import postgresql_db_store
+
+  total_rows = 0
+  started_at = time.perf_counter()
+  conn = postgresql_db_store.get_connection()
+
+  try:
+    postgresql_db_store.create_characters_table(conn=conn)
+
+    records_iter = iter(merged_results)
+    for batch in iter(lambda: list(itertools.islice(records_iter, batch_size)), []):
+      batch_started_at = time.perf_counter()
+      batch_rows = postgresql_db_store.upsert_characters(batch, conn=conn)
+      total_rows += batch_rows
+      print(f"Upserted {batch_rows} rows ({_rate(len(batch), batch_started_at):.0f} rows/s)")
+  finally:
+    conn.close()
+
+  print(f"Loaded {total_rows} rows into PostgreSQL ({_rate(total_rows, started_at):.0f} rows/s)")
+  return total_rows
+
+
+def execute_columnar(merged_results, result_file_path: str = COLUMNAR_RESULT_FILE_PATH) -> int:
+  """
+  Load the results to a columnar file, see utils/columnar.py.
+  Unlike the JSON sink this materializes the records, as the file is written column by column.
+
+  :param merged_results: Iterable (e.g. a generator) of dicts with merged results.
+  :param result_file_path: Path of the output file.
+  :return: Number of records written.
+  """
+  return columnar.write_columnar(merged_results, result_file_path)
+
+
+# Sinks the load phase can write to, selected by name in the pipeline
+SINKS = {
+  "json": execute_stream,
+  "columnar": execute_columnar,
+  "postgres": execute_postgres,
+}
+
+# Output file of the file based sinks, other sinks upsert into a database
+SINK_FILE_PATHS = {
+  "json": RESULT_FILE_PATH,
+  "columnar": COLUMNAR_RESULT_FILE_PATH,
+}
+
+
+def execute_sink(merged_results, sink: str = "json", **sink_options) -> int:
+  """
+  Load the results into the given sink.
+
+  :param sink: Name of a sink registered in SINKS.
+  :param sink_options: Keyword arguments passed on to the sink.
+  :return: Number of records loaded.
+  """
+  if sink not in SINKS:
+    raise ValueError(f"Unknown load sink: {sink}. Expected one of {sorted(SINKS)}")
+
+  return SINKS[sink](merged_results, **sink_options)
+
+
+def _rate(records: int, started_at: float) -> float:
+  elapsed = time.perf_counter() - started_at
+  return records / elapsed if elapsed else float("inf")
@@ -0,0 +1,177 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+
+DEFAULT_QUEUE_SIZE = 1_000  # Records buffered between two stages
+_END_OF_STREAM = object()
+
+
+class PipelineCancelled(RuntimeError):
+  """Raised inside a stage that is cancelled because another stage failed."""
+
+
+@dataclass
+class Stage:
+  """
+  A pipeline stage.
+
+  `func` is called with one iterator per dependency, in the order of `deps`. If other
+  stages depend on it, it returns an iterable whose records are streamed to them as
+  they are produced; the return value of a stage nothing depends on is kept as the
+  stage result.
+  """
+  name: str
+  func: Callable[..., Any]
+  deps: Sequence[str] = ()
+
+
+@dataclass
+class StageMetrics:
+  name: str
+  wall_time: float = 0.0
+  records: int = 0
+  result: Any = None
+  error: Optional[BaseException] = field(default=None, repr=False)
+
+  @property
+  def throughput(self) -> float:
+    return self.records / self.wall_time if self.wall_time else 0.0
+
+
+class Pipeline:
+  """
+  Runs stages as a DAG: every stage gets its own thread, so independent stages run
+  concurrently, and records flow through bounded queues, so a downstream stage starts
+  as soon as its upstream stages produce their first records.
+  """
+
+  def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+    self.queue_size = queue_size
+    self.stages: Dict[str, Stage] = {}
+
+  def add_stage(self, name: str, func: Callable[..., Any], deps: Sequence[str] = ()) -> "Pipeline":
+    if name in self.stages:
+      raise ValueError(f"Stage {name} is already defined")
+    self.stages[name] = Stage(name=name, func=func, deps=tuple(deps))
+    return self
+
+  def run(self) -> Dict[str, StageMetrics]:
+    """
+    Runs all stages and waits for them to finish.
+    If a stage fails the other stages are cancelled and the first error is raised.
+
+    :return: Metrics (wall time, records, throughput and result) per stage.
+    """
+    self._check_graph()
+
+    cancelled = threading.Event()
+    # One bounded queue per edge, keyed by (upstream, downstream)
+    edges = {(dep, stage.name): queue.Queue(maxsize=self.queue_size)
+             for stage in self.stages.values() for dep in stage.deps}
+    metrics = {name: StageMetrics(name=name) for name in self.stages}
+
+    threads = [
+      threading.Thread(target=self._run_stage, name=f"stage-{stage.name}",
+                       args=(stage, edges, metrics[stage.name], cancelled), daemon=True)
+      for stage in self.stages.values()
+    ]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+    errors = [stage_metrics.error for stage_metrics in metrics.values() if stage_metrics.error is not None]
+    if errors:
+      # Report the failure that caused the cancellation rather than its consequences
+      raise next((e for e in errors if not isinstance(e, PipelineCancelled)), errors[0])
+
+    return metrics
+
+  def _run_stage(self, stage: Stage, edges, stage_metrics: StageMetrics, cancelled: threading.Event):
+    outputs = [edge_queue for (upstream, _), edge_queue in edges.items() if upstream == stage.name]
+    consumed = [0]
+    inputs = [_drain(edges[(dep, stage.name)], cancelled, consumed) for dep in stage.deps]
+    started_at = time.perf_counter()
+
+    try:
+      result = stage.func(*inputs)
+
+      if outputs:
+        for record in result:
+          if cancelled.is_set():
+            raise PipelineCancelled("Pipeline cancelled because another stage failed")
+          for output in outputs:
+            _put(output, record, cancelled)
+          stage_metrics.records += 1
+      else:
+        stage_metrics.result = result
+        stage_metrics.records = consumed[0]
+
+      # Drain what the stage did not read, so its upstream stages never block on a full queue
+      for stage_input in inputs:
+        for _ in stage_input:
+          pass
+    except BaseException as e:
+      stage_metrics.error = e
+      cancelled.set()
+    finally:
+      stage_metrics.wall_time = time.perf_counter() - started_at
+      for output in outputs:
+        _put(output, _END_OF_STREAM, cancelled)
+
+  def _check_graph(self):
+    for stage in self.stages.values():
+      for dep in stage.deps:
+        if dep not in self.stages:
+          raise ValueError(f"Stage {stage.name} depends on unknown stage {dep}")
+
+    # Kahn's algorithm, whatever is left over is part of a cycle
+    remaining = {name: set(stage.deps) for name, stage in self.stages.items()}
+    while True:
+      ready = [name for name, deps in remaining.items() if not deps]
+      if not ready:
+        break
+      for name in ready:
+        del remaining[name]
+      for deps in remaining.values():
+        deps.difference_update(ready)
+
+    if remaining:
+      raise ValueError(f"Stages form a cycle: {sorted(remaining)}")
+
+
+def format_metrics(metrics: Dict[str, StageMetrics]) -> List[str]:
+  """Returns one human readable line per stage."""
+  return [
+    f"{stage_metrics.name:<16} {stage_metrics.wall_time:>8.3f}s {stage_metrics.records:>10} records "
+    f"{stage_metrics.throughput:>12.0f} records/s"
+    for stage_metrics in metrics.values()
+  ]
+
+
+def _drain(edge_queue: queue.Queue, cancelled: threading.Event, consumed: List[int]) -> Iterator[Any]:
+  while True:
+    try:
+      record = edge_queue.get(timeout=0.1)
+    except queue.Empty:
+      if cancelled.is_set():
+        raise PipelineCancelled("Pipeline cancelled because another stage failed")
+      continue
+
+    if record is _END_OF_STREAM:
+      return
+    consumed[0] += 1
+    yield record
+
+
+def _put(edge_queue: queue.Queue, record, cancelled: threading.Event):
+  while True:
+    try:
+      edge_queue.put(record, timeout=0.1)
+      return
+    except queue.Full:
+      if cancelled.is_set():
+        return
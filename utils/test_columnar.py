@@ -0,0 +1,62 @@
+import json
+
+import utils.columnar
+
+
+def test_columnar_round_trip_keeps_records(tmp_path):
+    """Test that records read back from a columnar file equal the written ones."""
+    # Arrange
+    records = [
+        {"name": "Luke Skywalker", "gender": "male", "films": ["a", "b"], "height": "172"},
+        {"name": "Leia Organa", "gender": "female", "films": [], "height": "150"},
+        {"name": "R2-D2", "gender": "n/a", "height": "96", "species": ["droid"]},
+    ]
+    file_path = tmp_path / "characters.col"
+
+    # Act
+    total_records = utils.columnar.write_columnar(records, str(file_path))
+    with utils.columnar.ColumnarFile(str(file_path)) as columnar_file:
+        result = list(columnar_file)
+
+    # Assert
+    assert total_records == 3
+    assert result == records, "Absent columns should stay absent"
+
+
+def test_columnar_reads_single_column_and_record(tmp_path):
+    """Test that one column or one record can be read without materializing the file."""
+    # Arrange
+    records = [{"name": f"Person {number}", "gender": "male" if number % 2 else "female"}
+               for number in range(10)]
+    file_path = tmp_path / "characters.col"
+    utils.columnar.write_columnar(records, str(file_path))
+
+    # Act
+    with utils.columnar.ColumnarFile(str(file_path)) as columnar_file:
+        gender = columnar_file.column("gender")
+        dictionary = gender.dictionary
+        codes = list(gender.codes)
+        fourth = columnar_file.record(3)
+        last_name = columnar_file.column("name")[-1]
+
+    # Assert
+    assert gender.encoding == "dict"
+    assert dictionary == ["female", "male"]
+    assert codes == [0, 1] * 5
+    assert fourth == {"name": "Person 3", "gender": "male"}
+    assert last_name == "Person 9"
+
+
+def test_json_to_columnar_and_back(tmp_path):
+    """Test that the converters between JSON and columnar files are lossless."""
+    # Arrange
+    records = [{"name": "Luke Skywalker", "mass": 77, "homeworld": "https://swapi.info/api/planets/1"}]
+    json_path = tmp_path / "merged_result.json"
+    json_path.write_text(json.dumps(records))
+
+    # Act
+    utils.columnar.json_to_columnar(str(json_path), str(tmp_path / "merged_result.col"))
+    utils.columnar.columnar_to_json(str(tmp_path / "merged_result.col"), str(tmp_path / "round_trip.json"))
+
+    # Assert
+    assert json.loads((tmp_path / "round_trip.json").read_text()) == records
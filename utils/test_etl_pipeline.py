@@ -0,0 +1,52 @@
+import json
+
+import utils.etl_pipeline
+import utils.extract
+
+
+SOURCES = {
+    "base": [
+        {"uid": "1", "name": "Luke Skywalker", "height": "172", "mass": "77", "hair_color": "blond",
+         "skin_color": "fair", "eye_color": "blue"},
+        {"uid": "2", "name": "C-3PO"},
+    ],
+    "latest": [
+        {"birth_year": "19BBY", "gender": "male", "homeworld": "https://swapi.dev/api/planets/1/",
+         "created": "2014-12-09T13:50:51.644000Z", "edited": "2014-12-20T21:17:56.891000Z",
+         "url": "https://swapi.dev/api/people/1/"},
+        {"gender": "n/a", "url": "https://swapi.dev/api/people/3/"},
+    ],
+}
+
+
+def test_batch_pipeline_runs_as_instrumented_dag(tmp_path, monkeypatch):
+    """Test that the default pipeline runs every phase as a stage and reports metrics per stage."""
+    # Arrange
+    monkeypatch.setattr(utils.extract, "execute_source",
+                        lambda source_name, cache_format="json": list(SOURCES[source_name]))
+    result_file_path = tmp_path / "merged_result.json"
+
+    # Act
+    metrics = utils.etl_pipeline.run_pipeline(sink_options={"result_file_path": str(result_file_path)})
+
+    # Assert
+    assert list(metrics) == ["extract_base", "extract_latest", "transform", "validate", "load"]
+    assert metrics["extract_latest"].records == 2
+    assert metrics["transform"].records == 1
+    assert metrics["load"].result == 1
+    assert [person["name"] for person in json.loads(result_file_path.read_text())] == ["Luke Skywalker"]
+
+
+def test_pipeline_keeps_existing_output_when_nothing_is_extracted(tmp_path, monkeypatch):
+    """Test that a failed (empty) extraction does not replace the output of the last run."""
+    # Arrange
+    monkeypatch.setattr(utils.extract, "execute_source", lambda source_name, cache_format="json": [])
+    result_file_path = tmp_path / "merged_result.json"
+    result_file_path.write_text('[{"name": "Luke Skywalker"}]')
+
+    # Act
+    metrics = utils.etl_pipeline.run_pipeline(sink_options={"result_file_path": str(result_file_path)})
+
+    # Assert
+    assert metrics["load"].result == 0
+    assert json.loads(result_file_path.read_text()) == [{"name": "Luke Skywalker"}]
@@ -0,0 +1,64 @@
+import json
+
+import utils.helper_functions
+
+
+def test_iter_json_records_streams_json_array(tmp_path):
+    """Test that records of a JSON array are parsed correctly across chunk boundaries."""
+    # Arrange
+    records = [
+        {"name": "Luke Skywalker", "height": "172", "films": ["https://swapi.info/api/films/1"]},
+        {"name": "Darth Vader", "height": "202", "films": []},
+        {"name": "Leia Organa", "height": "150", "films": ["a", "b"]}
+    ]
+    file_path = tmp_path / "result.json"
+    file_path.write_text(json.dumps(records, indent=2))
+
+    # Act: A tiny chunk size forces every record to be split over several reads
+    result = list(utils.helper_functions.iter_json_records(str(file_path), chunk_size=7))
+
+    # Assert
+    assert result == records
+
+
+def test_iter_json_records_streams_ndjson(tmp_path):
+    """Test that records of an NDJSON file are parsed one per line."""
+    # Arrange
+    records = [{"name": "Luke Skywalker"}, {"name": "Darth Vader"}]
+    file_path = tmp_path / "result.ndjson"
+    file_path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    # Act
+    result = list(utils.helper_functions.iter_json_records(str(file_path), chunk_size=5))
+
+    # Assert
+    assert result == records
+
+
+def test_iter_json_records_with_empty_array(tmp_path):
+    """Test that an empty JSON array yields no records."""
+    # Arrange
+    file_path = tmp_path / "result.json"
+    file_path.write_text("[\n]")
+
+    # Act
+    result = list(utils.helper_functions.iter_json_records(str(file_path)))
+
+    # Assert
+    assert result == []
+
+
+def test_fetch_data_builds_missing_columnar_cache_from_json_cache(tmp_path):
+    """Test that a columnar cache miss is served from the JSON cache of the same source, not the API."""
+    # Arrange
+    records = [{"name": "Luke Skywalker", "gender": "male"}, {"name": "R2-D2", "gender": "n/a"}]
+    (tmp_path / "base_result.json").write_text(json.dumps(records))
+    columnar_file_path = tmp_path / "base_result.col"
+
+    # Act: The URL is unreachable, a request would leave the result empty
+    result = utils.helper_functions.fetch_data_if_not_cached(
+        "http://127.0.0.1:9/unreachable", str(columnar_file_path), lambda response: response)
+
+    # Assert
+    assert result == records
+    assert columnar_file_path.exists()
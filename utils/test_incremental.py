@@ -0,0 +1,61 @@
+import utils.incremental
+import utils.transform
+
+
+def test_select_changed_returns_only_new_or_changed_persons():
+    """Test that a second run only selects persons changed since the first run."""
+    # Arrange
+    base_result = [{"uid": "1", "name": "Luke Skywalker"}, {"uid": "2", "name": "C-3PO"}]
+    latest_result = [
+        {"height": "172", "edited": "2014-12-20T21:17:56.891000Z", "url": "https://swapi.info/api/people/1"},
+        {"height": "167", "edited": "2014-12-20T21:17:50.309000Z", "url": "https://swapi.info/api/people/2"},
+    ]
+    empty_state = utils.incremental.load_state("./does/not/exist.json")
+    _, _, state = utils.incremental.select_changed(base_result, latest_result, empty_state,
+                                                   key_func=utils.transform.person_id)
+
+    # Act: Person 2 gets edited after the first run
+    latest_result[1] = {"height": "170", "edited": "2015-01-01T00:00:00.000000Z",
+                        "url": "https://swapi.info/api/people/2"}
+    base_changed, latest_changed, new_state = utils.incremental.select_changed(
+        base_result, latest_result, state, key_func=utils.transform.person_id)
+
+    # Assert
+    assert state["watermark"] == "2014-12-20T21:17:56.891000Z"
+    assert [person["uid"] for person in base_changed] == ["2"], "Join partner should be kept"
+    assert [person["height"] for person in latest_changed] == ["170"]
+    assert new_state["watermark"] == "2015-01-01T00:00:00.000000Z"
+
+
+def test_merge_into_output_upserts_by_key():
+    """Test that changed persons replace existing ones and new persons are appended."""
+    # Arrange
+    existing_result = [{"uid": "1", "height": "172"}, {"uid": "2", "height": "167"}]
+    changed_result = [{"uid": "3", "height": "96"}, {"uid": "1", "height": "173"}]
+
+    # Act
+    result = utils.incremental.merge_into_output(existing_result, changed_result,
+                                                 key_func=utils.transform.person_id)
+
+    # Assert
+    assert result == [{"uid": "1", "height": "173"}, {"uid": "2", "height": "167"}, {"uid": "3", "height": "96"}]
+
+
+def test_run_stage_resumes_from_checkpoint(tmp_path):
+    """Test that a completed stage is not run again until the checkpoints are cleared."""
+    # Arrange
+    calls = []
+
+    def stage():
+        calls.append(1)
+        return {"records": [1, 2, 3]}
+
+    # Act
+    first = utils.incremental.run_stage("extract", stage, checkpoint_dir_path=str(tmp_path))
+    resumed = utils.incremental.run_stage("extract", stage, checkpoint_dir_path=str(tmp_path))
+    utils.incremental.clear_checkpoints(str(tmp_path))
+    rerun = utils.incremental.run_stage("extract", stage, checkpoint_dir_path=str(tmp_path))
+
+    # Assert
+    assert first == resumed == rerun == {"records": [1, 2, 3]}
+    assert len(calls) == 2, "Stage should be skipped while its checkpoint exists"
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import utils.load
+
+
+def test_execute_stream_writes_json_array(tmp_path):
+    """Test that execute_stream writes a valid JSON array from a generator."""
+    # Arrange
+    records = [{"name": "Luke Skywalker", "films": ["a", "b"]}, {"name": "Darth Vader", "films": []}]
+    file_path = tmp_path / "merged_result.json"
+
+    # Act
+    total_records = utils.load.execute_stream((record for record in records), str(file_path))
+
+    # Assert
+    assert total_records == 2
+    assert json.loads(file_path.read_text()) == records
+    assert not (tmp_path / "merged_result.json.tmp").exists(), "Temporary file should be cleaned up"
+
+
+def test_execute_stream_writes_ndjson(tmp_path):
+    """Test that execute_stream writes one JSON document per line for .ndjson paths."""
+    # Arrange
+    records = [{"name": "Luke Skywalker"}, {"name": "Darth Vader"}]
+    file_path = tmp_path / "merged_result.ndjson"
+
+    # Act
+    total_records = utils.load.execute_stream(iter(records), str(file_path))
+
+    # Assert
+    assert total_records == 2
+    assert [json.loads(line) for line in file_path.read_text().splitlines()] == records
+
+
+def test_execute_stream_with_no_records(tmp_path):
+    """Test that execute_stream writes an empty JSON array when nothing is streamed."""
+    # Arrange
+    file_path = tmp_path / "merged_result.json"
+
+    # Act
+    total_records = utils.load.execute_stream(iter([]), str(file_path))
+
+    # Assert
+    assert total_records == 0
+    assert json.loads(file_path.read_text()) == []
+
+
+def test_execute_sink_dispatches_to_registered_sink(tmp_path):
+    """Test that execute_sink passes the records and options to the selected sink."""
+    # Arrange
+    file_path = tmp_path / "merged_result.json"
+
+    # Act
+    total_records = utils.load.execute_sink(iter([{"name": "Luke Skywalker"}]), "json",
+                                            result_file_path=str(file_path))
+
+    # Assert
+    assert total_records == 1
+    assert json.loads(file_path.read_text()) == [{"name": "Luke Skywalker"}]
+
+
+def test_execute_sink_rejects_unknown_sink():
+    """Test that an unknown sink name raises a ValueError."""
+    with pytest.raises(ValueError, match="parquet"):
+        utils.load.execute_sink(iter([]), "parquet")
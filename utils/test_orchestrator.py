@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+import utils.orchestrator
+
+
+def test_pipeline_streams_records_through_dependent_stages():
+    """Test that records flow through the DAG and every stage reports metrics."""
+    # Arrange
+    pipeline = utils.orchestrator.Pipeline(queue_size=2)
+    pipeline.add_stage("numbers", lambda: range(100))
+    pipeline.add_stage("letters", lambda: iter("abc"))
+    pipeline.add_stage("double", lambda numbers: (number * 2 for number in numbers), deps=["numbers"])
+    pipeline.add_stage("total", lambda doubled, letters: (sum(doubled), "".join(letters)),
+                       deps=["double", "letters"])
+
+    # Act
+    metrics = pipeline.run()
+
+    # Assert
+    assert metrics["total"].result == (9900, "abc")
+    assert metrics["numbers"].records == 100
+    assert metrics["double"].records == 100
+    assert metrics["total"].records == 103, "Sink stages count the records they consumed"
+    assert all(stage_metrics.wall_time >= 0 for stage_metrics in metrics.values())
+
+
+def test_pipeline_runs_independent_stages_concurrently():
+    """Test that independent stages run at the same time instead of back to back."""
+    # Arrange: Each stage waits until the other one has started
+    barrier = threading.Barrier(2, timeout=5)
+
+    def stage():
+        barrier.wait()
+        return 1
+
+    pipeline = utils.orchestrator.Pipeline()
+    pipeline.add_stage("first", stage)
+    pipeline.add_stage("second", stage)
+
+    # Act
+    metrics = pipeline.run()
+
+    # Assert
+    assert metrics["first"].result == metrics["second"].result == 1
+
+
+def test_pipeline_starts_downstream_before_upstream_finishes():
+    """Test that a downstream stage receives records while its upstream is still producing."""
+    # Arrange
+    first_record_consumed = threading.Event()
+
+    def produce():
+        yield 1
+        assert first_record_consumed.wait(timeout=5), "Downstream should consume the first record early"
+        yield 2
+
+    def consume(records):
+        result = []
+        for record in records:
+            result.append(record)
+            first_record_consumed.set()
+        return result
+
+    pipeline = utils.orchestrator.Pipeline(queue_size=1)
+    pipeline.add_stage("produce", produce)
+    pipeline.add_stage("consume", consume, deps=["produce"])
+
+    # Act
+    metrics = pipeline.run()
+
+    # Assert
+    assert metrics["consume"].result == [1, 2]
+
+
+def test_pipeline_raises_the_failing_stage_error():
+    """Test that a failing stage cancels the pipeline and its error is raised."""
+    # Arrange
+    def fail(records):
+        next(records)
+        raise KeyError("broken")
+
+    pipeline = utils.orchestrator.Pipeline(queue_size=1)
+    pipeline.add_stage("produce", lambda: range(1_000_000))
+    pipeline.add_stage("fail", fail, deps=["produce"])
+
+    # Act & Assert
+    with pytest.raises(KeyError, match="broken"):
+        pipeline.run()
+
+
+def test_pipeline_rejects_cycles():
+    """Test that a cyclic graph is rejected before any stage runs."""
+    # Arrange
+    pipeline = utils.orchestrator.Pipeline()
+    pipeline.add_stage("a", lambda records: records, deps=["b"])
+    pipeline.add_stage("b", lambda records: records, deps=["a"])
+
+    # Act & Assert
+    with pytest.raises(ValueError, match="cycle"):
+        pipeline.run()
@@ -6,6 +6,7 @@ def test_execute_returns_required_keys():
     # Arrange: Create mock base_result data
     base_result = [
         {
+            "uid": "1",
             "name": "Luke Skywalker",
             "height": "172",
             "mass": "77",
@@ -14,6 +15,7 @@ def test_execute_returns_required_keys():
             "eye_color": "blue",
         },
         {
+            "uid": "4",
             "name": "Darth Vader",
             "height": "202",
             "mass": "136",
@@ -80,6 +82,7 @@ def test_execute_merges_data_correctly():
     # Arrange
     base_result = [
         {
+            "uid": "1",
             "name": "Luke Skywalker",
             "height": "172",
             "mass": "77",
@@ -90,6 +93,7 @@ def test_execute_merges_data_correctly():
         {
             "gender": "male",
             "homeworld": "https://swapi.dev/api/planets/1/",
+            "url": "https://swapi.dev/api/people/1/",
         }
     ]
     
@@ -116,3 +120,111 @@ def test_execute_with_empty_lists():
     # Assert
     assert isinstance(result, list), "Result should be a list"
     assert len(result) == 0, "Result should be empty"
+
+
+def test_execute_matches_persons_by_key_not_position():
+    """Test that persons are merged by id even when ordering and lengths differ."""
+    # Arrange
+    base_result = [
+        {"uid": "2", "name": "C-3PO"},
+        {"uid": "1", "name": "Luke Skywalker"},
+    ]
+    latest_result = [
+        {"height": "172", "url": "https://swapi.info/api/people/1"},
+        {"height": "96", "url": "https://swapi.info/api/people/99"},
+        {"height": "167", "url": "https://swapi.info/api/people/2"},
+    ]
+
+    # Act
+    result = utils.transform.execute(base_result, latest_result)
+
+    # Assert
+    heights = {person["name"]: person["height"] for person in result}
+    assert heights == {"Luke Skywalker": "172", "C-3PO": "167"}
+
+
+def test_execute_supports_left_and_outer_joins():
+    """Test that left joins keep unmatched BASE persons and outer joins keep both sides."""
+    # Arrange
+    base_result = [{"uid": "1", "name": "Luke Skywalker"}, {"uid": "3", "name": "R2-D2"}]
+    latest_result = [
+        {"height": "172", "url": "https://swapi.info/api/people/1"},
+        {"height": "96", "url": "https://swapi.info/api/people/99"},
+    ]
+
+    # Act
+    left_result = utils.transform.execute(base_result, latest_result, how="left")
+    outer_result = utils.transform.execute(base_result, latest_result, how="outer")
+
+    # Assert
+    assert sorted(utils.transform.person_id(person) for person in left_result) == ["1", "3"]
+    assert sorted(utils.transform.person_id(person) for person in outer_result) == ["1", "3", "99"]
+
+
+def test_hash_join_spills_to_disk_partitions():
+    """Test that the join gives the same result when the build side does not fit in memory."""
+    # Arrange
+    base_result = [{"uid": str(number), "name": f"Person {number}"} for number in range(50)]
+    latest_result = [{"mass": str(number), "url": f"https://swapi.info/api/people/{number}"}
+                     for number in range(25, 75)]
+
+    # Act
+    in_memory = list(utils.transform.hash_join(base_result, latest_result, how="outer"))
+    spilled = list(utils.transform.hash_join(iter(base_result), iter(latest_result), how="outer",
+                                             max_in_memory_records=10, partitions=4))
+
+    # Assert
+    sort_key = utils.transform.person_id
+    assert sorted(spilled, key=sort_key) == sorted(in_memory, key=sort_key)
+    assert len(spilled) == 75
+
+
+def test_normalize_drops_additional_properties_and_coerces_types():
+    """Test that normalize enforces the schema on merged persons."""
+    # Arrange
+    person = {
+        "uid": "1",
+        "name": "Luke Skywalker",
+        "height": 172,
+        "mass": "77",
+        "hair_color": "blond",
+        "skin_color": "fair",
+        "eye_color": "blue",
+        "birth_year": "19BBY",
+        "gender": "male",
+        "homeworld": "https://swapi.info/api/planets/1",
+        "films": ["https://swapi.info/api/films/1"],
+        "created": "2014-12-09T13:50:51.644000Z",
+        "edited": "2014-12-20T21:17:56.891000Z",
+        "url": "https://swapi.info/api/people/1"
+    }
+
+    # Act
+    result, report = utils.transform.normalize([person])
+
+    # Assert
+    assert report["valid"] == 1 and report["invalid"] == 0
+    assert "uid" not in result[0] and "films" not in result[0], "Additional properties should be dropped"
+    assert result[0]["height"] == "172", "Height should be coerced to a string"
+    assert set(result[0]) == set(utils.transform.SCHEMA["items"]["required"])
+
+
+def test_normalize_flags_invalid_persons():
+    """Test that persons missing required fields or with malformed formats are dropped and counted."""
+    # Arrange
+    validate = utils.transform.compile_schema()
+    persons = [
+        {"name": "Luke Skywalker", "url": "https://swapi.info/api/people/1"},
+        {"name": "Darth Vader", "edited": "yesterday", "url": "https://swapi.info/api/people/4"}
+    ]
+
+    # Act
+    result, report = utils.transform.normalize(persons, workers=2, chunk_size=1)
+    _, errors = validate(persons[1])
+
+    # Assert
+    assert result == []
+    assert report["invalid"] == 2
+    assert len(report["chunks"]) == 2
+    assert "height: missing required field" in errors
+    assert any(error.startswith("edited: not a valid date-time") for error in errors)
@@ -1,96 +1,458 @@
-from typing import List, Dict, Any
+import os
+import json
+import time
+import zlib
+import tempfile
+import itertools
+import multiprocessing
+from datetime import datetime
+from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple, Union
 
-def execute(base_result, latest_result) -> List[Dict[str, Any]]:
-  """
-  The transformation phase, cleans and merges the data based on a standard schema.
-  This function is going to return a result object based on the following JSON schema:
-
-  {
-    "$schema": "http://json-schema.org/draft-07/schema#",
-    "title": "Star Wars Characters List",
-    "description": "Schema for a list of Star Wars characters from SWAPI",
-    "type": "array",
-    "items": {
-      "type": "object",
-      "required": [
-        "name",
-        "height",
-        "mass",
-        "hair_color",
-        "skin_color",
-        "eye_color",
-        "birth_year",
-        "gender",
-        "homeworld",
-        "created",
-        "edited",
-        "url"
-      ],
-      "properties": {
-        "name":  {
-          "type": "string",
-          "description": "The name of the character"
-        },
-        "height": {
-          "type": "string",
-          "description": "The height of the character in centimeters"
-        },
-        "mass": {
-          "type": "string",
-          "description": "The mass of the character in kilograms"
-        },
-        "hair_color": {
-          "type": "string",
-          "description": "The hair color of the character"
-        },
-        "skin_color": {
-          "type": "string",
-          "description": "The skin color of the character"
-        },
-        "eye_color": {
-          "type": "string",
-          "description": "The eye color of the character"
-        },
-        "birth_year": {
-          "type": "string",
-          "description": "The birth year of the character"
-        },
-        "gender": {
-          "type": "string",
-          "description": "The gender of the character"
-        },
-        "homeworld": {
-          "type": "string",
-          "format": "uri",
-          "description": "URL to the character's homeworld"
-        },
-        "created": {
-          "type": "string",
-          "format": "date-time",
-          "description": "ISO 8601 date-time when the resource was created"
-        },
-        "edited": {
-          "type": "string",
-          "format": "date-time",
-          "description": "ISO 8601 date-time when the resource was last edited"
-        },
-        "url": {
-          "type": "string",
-          "format": "uri",
-          "description": "The URL of the character resource"
-        }
+
+JOIN_TYPES = ("inner", "left", "outer")
+MAX_IN_MEMORY_RECORDS = 100_000  # Build side size above which the join spills to disk
+SPILL_PARTITIONS = 16
+NORMALIZE_CHUNK_SIZE = 10_000  # Records validated per chunk (and per worker task)
+
+SCHEMA = {
+  "$schema": "http://json-schema.org/draft-07/schema#",
+  "title": "Star Wars Characters List",
+  "description": "Schema for a list of Star Wars characters from SWAPI",
+  "type": "array",
+  "items": {
+    "type": "object",
+    "required": [
+      "name",
+      "height",
+      "mass",
+      "hair_color",
+      "skin_color",
+      "eye_color",
+      "birth_year",
+      "gender",
+      "homeworld",
+      "created",
+      "edited",
+      "url"
+    ],
+    "properties": {
+      "name": {
+        "type": "string",
+        "description": "The name of the character"
+      },
+      "height": {
+        "type": "string",
+        "description": "The height of the character in centimeters"
+      },
+      "mass": {
+        "type": "string",
+        "description": "The mass of the character in kilograms"
+      },
+      "hair_color": {
+        "type": "string",
+        "description": "The hair color of the character"
+      },
+      "skin_color": {
+        "type": "string",
+        "description": "The skin color of the character"
+      },
+      "eye_color": {
+        "type": "string",
+        "description": "The eye color of the character"
+      },
+      "birth_year": {
+        "type": "string",
+        "description": "The birth year of the character"
+      },
+      "gender": {
+        "type": "string",
+        "description": "The gender of the character"
+      },
+      "homeworld": {
+        "type": "string",
+        "format": "uri",
+        "description": "URL to the character's homeworld"
+      },
+      "created": {
+        "type": "string",
+        "format": "date-time",
+        "description": "ISO 8601 date-time when the resource was created"
+      },
+      "edited": {
+        "type": "string",
+        "format": "date-time",
+        "description": "ISO 8601 date-time when the resource was last edited"
       },
-      "additionalProperties": false
+      "url": {
+        "type": "string",
+        "format": "uri",
+        "description": "The URL of the character resource"
+      }
     },
-    "minItems": 0
-  }
+    "additionalProperties": False
+  },
+  "minItems": 0
+}
+
+
+def person_id(person: Dict[str, Any]) -> Optional[str]:
+  """
+  Returns the SWAPI person id of a record.
+  The OLD API provides it as `uid`, the NEW API only as the last segment of `url`.
+  """
+  uid = person.get("uid")
+  if uid:
+    return str(uid)
+
+  url = person.get("url")
+  if url:
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+  return None
+
+
+def execute(base_result, latest_result, key: Union[str, Callable] = person_id,
+            how: str = "inner") -> List[Dict[str, Any]]:
+  """
+  The transformation phase, cleans and merges the data based on a standard schema.
+  This function is going to return a result object based on the JSON schema in SCHEMA,
+  which normalize enforces on the merged persons.
+
+  Persons are matched by `key` (the person id by default) rather than by their
+  position in the lists, see hash_join for the join semantics.
 
-  
   :param base_result: Data (List) from OLD Start Wars API
   :param latest_result: Data (List) from OLD Start Wars API
+  :param key: Field name or callable returning the join key of a person.
+  :param how: Join type, one of "inner", "left" (keep every BASE person) or "outer".
   """
-  for base_person, latest_person in zip(base_result, latest_result):
-    base_person.update(latest_person)
+  result = list(hash_join(base_result, latest_result, key=key, how=how))
 
   print(f"Merging complete.")
-  return base_result
\ No newline at end of file
+  return result
+
+
+def execute_stream(base_result: Iterable[Dict[str, Any]],
+                   latest_result: Iterable[Dict[str, Any]],
+                   key: Union[str, Callable] = person_id,
+                   how: str = "inner") -> Iterator[Dict[str, Any]]:
+  """
+  Streaming variant of execute.
+  Only the BASE side is indexed (or spilled to disk when too large), the LATEST side
+  is consumed lazily and each merged person is yielded as soon as it is ready.
+
+  :param base_result: Iterable of dicts from OLD Star Wars API
+  :param latest_result: Iterable of dicts from NEW Star Wars API
+  """
+  yield from hash_join(base_result, latest_result, key=key, how=how)
+
+
+def hash_join(base_result: Iterable[Dict[str, Any]],
+              latest_result: Iterable[Dict[str, Any]],
+              key: Union[str, Callable] = person_id,
+              how: str = "inner",
+              max_in_memory_records: int = MAX_IN_MEMORY_RECORDS,
+              partitions: int = SPILL_PARTITIONS) -> Iterator[Dict[str, Any]]:
+  """
+  Joins BASE and LATEST persons on a key. For every match a new dict with the BASE
+  fields updated by the LATEST fields is yielded.
+
+  The hash index is built on the smaller side when both sizes are known, otherwise on
+  the BASE side. If the indexed side holds more than `max_in_memory_records` records,
+  both sides are hash partitioned into temporary NDJSON files and joined partition by
+  partition (grace hash join); the output order then follows the partitions.
+
+  :param how: "inner" keeps matches only, "left" also keeps unmatched BASE persons and
+              "outer" keeps unmatched persons of both sides. Persons without a key never match.
+  """
+  if how not in JOIN_TYPES:
+    raise ValueError(f"Unsupported join type: {how}. Expected one of {JOIN_TYPES}")
+
+  key_func = key if callable(key) else (lambda person: person.get(key))
+
+  build_is_base = True
+  if hasattr(base_result, "__len__") and hasattr(latest_result, "__len__"):
+    build_is_base = len(base_result) <= len(latest_result)
+
+  build_side, probe_side = (base_result, latest_result) if build_is_base else (latest_result, base_result)
+  keep_build = how == "outer" or (how == "left" and build_is_base)
+  keep_probe = how == "outer" or (how == "left" and not build_is_base)
+
+  build_iter = iter(build_side)
+  build_records = []
+  for record in build_iter:
+    build_records.append(record)
+    if len(build_records) > max_in_memory_records:
+      break
+  else:
+    yield from _join_in_memory(build_records, probe_side, key_func, build_is_base, keep_build, keep_probe)
+    return
+
+  print(f"Join input exceeds {max_in_memory_records} records, spilling to {partitions} partitions.")
+  with tempfile.TemporaryDirectory(prefix="etl_join_") as spill_dir:
+    build_paths = _spill_partitions(_chain(build_records, build_iter), key_func, spill_dir, "build", partitions)
+    build_records = None
+    probe_paths = _spill_partitions(probe_side, key_func, spill_dir, "probe", partitions)
+
+    for build_path, probe_path in zip(build_paths, probe_paths):
+      yield from _join_in_memory(list(_read_partition(build_path)), _read_partition(probe_path),
+                                 key_func, build_is_base, keep_build, keep_probe)
+
+
+def _join_in_memory(build_records, probe_records, key_func, build_is_base, keep_build, keep_probe):
+  index: Dict[Any, List[int]] = {}
+  for position, record in enumerate(build_records):
+    record_key = key_func(record)
+    if record_key is not None:
+      index.setdefault(record_key, []).append(position)
+
+  matched = [False] * len(build_records) if keep_build else None
+
+  for probe_record in probe_records:
+    record_key = key_func(probe_record)
+    positions = index.get(record_key) if record_key is not None else None
+    if positions:
+      for position in positions:
+        if matched is not None:
+          matched[position] = True
+        build_record = build_records[position]
+        if build_is_base:
+          yield {**build_record, **probe_record}
+        else:
+          yield {**probe_record, **build_record}
+    elif keep_probe:
+      yield dict(probe_record)
+
+  if keep_build:
+    for position, build_record in enumerate(build_records):
+      if not matched[position]:
+        yield dict(build_record)
+
+
+def _chain(*iterables):
+  for iterable in iterables:
+    yield from iterable
+
+
+def _spill_partitions(records, key_func, spill_dir, prefix, partitions) -> List[str]:
+  paths = [os.path.join(spill_dir, f"{prefix}_{number}.ndjson") for number in range(partitions)]
+  partition_files = [open(path, "w") for path in paths]
+  try:
+    for record in records:
+      record_key = key_func(record)
+      # crc32 is stable across processes unlike hash(); keyless records all go to partition 0
+      number = zlib.crc32(str(record_key).encode("utf8")) % partitions if record_key is not None else 0
+      partition_files[number].write(json.dumps(record))
+      partition_files[number].write("\n")
+  finally:
+    for partition_file in partition_files:
+      partition_file.close()
+  return paths
+
+
+def _read_partition(path):
+  with open(path, "r") as partition_file:
+    for line in partition_file:
+      yield json.loads(line)
+
+
+def compile_schema(schema: Dict[str, Any] = SCHEMA) -> Callable[[Dict[str, Any]], Tuple[Dict[str, Any], List[str]]]:
+  """
+  Compiles the item schema of SCHEMA into a validator function.
+
+  All lookups in the schema happen once here; the returned function only runs the
+  precomputed per-property checks. It returns the normalized record (additional
+  properties dropped if not allowed, scalar values coerced to the declared type)
+  together with a list of errors, empty for a valid record.
+  """
+  item_schema = schema.get("items", schema)
+  required = tuple(item_schema.get("required", ()))
+  drop_additional = item_schema.get("additionalProperties", True) is False
+  checks = {name: _compile_property(prop_schema) for name, prop_schema in item_schema.get("properties", {}).items()}
+
+  def validate(record: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    normalized = {}
+    errors = []
+
+    for name, value in record.items():
+      check = checks.get(name)
+      if check is None:
+        if not drop_additional:
+          normalized[name] = value
+        continue
+
+      value, error = check(value)
+      if error:
+        errors.append(f"{name}: {error}")
+      normalized[name] = value
+
+    for name in required:
+      if name not in normalized:
+        errors.append(f"{name}: missing required field")
+
+    return normalized, errors
+
+  return validate
+
+
+def _compile_property(prop_schema: Dict[str, Any]):
+  coerce = _COERCERS.get(prop_schema.get("type"), lambda value: (value, None))
+  check_format = _FORMAT_CHECKERS.get(prop_schema.get("format"))
+
+  if check_format is None:
+    return coerce
+
+  def check(value):
+    value, error = coerce(value)
+    if error is None and not check_format(value):
+      error = f"not a valid {prop_schema['format']}: {value!r}"
+    return value, error
+
+  return check
+
+
+def _coerce_string(value):
+  if isinstance(value, str):
+    return value, None
+  if isinstance(value, bool):
+    return str(value).lower(), None
+  if isinstance(value, (int, float)):
+    return str(value), None
+  return value, f"expected string, got {type(value).__name__}"
+
+
+def _coerce_number(number_type):
+  def coerce(value):
+    if isinstance(value, number_type) and not isinstance(value, bool):
+      return value, None
+    try:
+      return number_type(str(value).replace(",", "")), None
+    except ValueError:
+      return value, f"expected {number_type.__name__}, got {value!r}"
+  return coerce
+
+
+def _is_uri(value) -> bool:
+  parsed = urlparse(value)
+  return bool(parsed.scheme and parsed.netloc)
+
+
+def _is_date_time(value) -> bool:
+  try:
+    datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return True
+  except ValueError:
+    return False
+
+
+_COERCERS = {
+  "string": _coerce_string,
+  "integer": _coerce_number(int),
+  "number": _coerce_number(float),
+}
+
+_FORMAT_CHECKERS = {
+  "uri": _is_uri,
+  "date-time": _is_date_time,
+}
+
+
+_validator = None
+
+
+def _validate_chunk(chunk: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str], float]:
+  """Validates one chunk, compiling the schema once per process on first use."""
+  global _validator
+  if _validator is None:
+    _validator = compile_schema()
+
+  started_at = time.perf_counter()
+  valid_records = []
+  errors = []
+  for record in chunk:
+    normalized, record_errors = _validator(record)
+    if record_errors:
+      errors.append(f"{person_id(record)}: {'; '.join(record_errors)}")
+    else:
+      valid_records.append(normalized)
+
+  return valid_records, errors, time.perf_counter() - started_at
+
+
+def normalize_stream(merged_results: Iterable[Dict[str, Any]],
+                     workers: int = 1,
+                     chunk_size: int = NORMALIZE_CHUNK_SIZE,
+                     report: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+  """
+  Validates and normalizes the merged persons against SCHEMA and yields the valid ones.
+  Invalid persons are dropped and counted.
+
+  The input is processed in chunks. With workers > 1 the chunks are fanned out to a
+  process pool; at most two chunks per worker are in flight so memory stays bounded
+  for streamed input, and the output keeps the input order.
+
+  :param report: Optional dict that is filled with the totals and per-chunk statistics
+                 (records, invalid records, seconds and records per second).
+  """
+  if report is None:
+    report = {}
+  report.update({"valid": 0, "invalid": 0, "chunks": []})
+
+  records_iter = iter(merged_results)
+  chunks = iter(lambda: list(itertools.islice(records_iter, chunk_size)), [])
+
+  for chunk_number, (chunk_size_actual, (valid_records, errors, seconds)) in enumerate(
+      _map_chunks(chunks, workers), start=1):
+    chunk_report = {
+      "chunk": chunk_number,
+      "records": chunk_size_actual,
+      "invalid": len(errors),
+      "seconds": seconds,
+      "records_per_second": chunk_size_actual / seconds if seconds else float("inf"),
+    }
+    report["chunks"].append(chunk_report)
+    report["valid"] += len(valid_records)
+    report["invalid"] += len(errors)
+
+    print(f"Chunk {chunk_number}: {chunk_size_actual} records, {len(errors)} invalid, "
+          f"{chunk_report['records_per_second']:.0f} records/s")
+    for error in errors[:3]:
+      print(f"  Invalid person {error}")
+
+    yield from valid_records
+
+
+def normalize(merged_result_list: List[Dict[str, Any]], workers: int = 1,
+              chunk_size: int = NORMALIZE_CHUNK_SIZE) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+  """
+  Validates and normalizes the merged persons against SCHEMA.
+
+  :return: The valid, normalized persons and a report, see normalize_stream.
+  """
+  report: Dict[str, Any] = {}
+  result = list(normalize_stream(merged_result_list, workers=workers, chunk_size=chunk_size, report=report))
+
+  print(f"Validation complete. {report['valid']} valid, {report['invalid']} invalid persons.")
+  return result, report
+
+
+def _map_chunks(chunks, workers):
+  if workers <= 1:
+    for chunk in chunks:
+      yield len(chunk), _validate_chunk(chunk)
+    return
+
+  # Forking while the other pipeline stages run in threads could copy locks held by them into
+  # the workers, spawned workers start clean (and compile the schema once, see _validate_chunk)
+  with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+    in_flight = []
+    for chunk in chunks:
+      in_flight.append((len(chunk), executor.submit(_validate_chunk, chunk)))
+      if len(in_flight) >= workers * 2:
+        chunk_length, future = in_flight.pop(0)
+        yield chunk_length, future.result()
+
+    for chunk_length, future in in_flight:
+      yield chunk_length, future.result()